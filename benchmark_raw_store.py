@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+原始数据存储格式基准测试 - 比较各格式的磁盘占用和解析耗时
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+from raw_store import RAW_FORMATS, list_raw_files, load_raw_file, raw_file_path, raw_file_stem, write_raw_file
+
+
+def benchmark_format(source_files, raw_format, work_dir, repeat):
+    """把所有文件转换成指定格式，测量总字节数和完整解析一遍的耗时"""
+    format_dir = os.path.join(work_dir, raw_format.replace('.', '_'))
+    os.makedirs(format_dir, exist_ok=True)
+
+    converted = []
+    for source in source_files:
+        file_data = load_raw_file(source)
+        target = raw_file_path(format_dir, raw_file_stem(source), raw_format)
+        write_raw_file(target, file_data.get('metadata', {}), file_data.get('data', []))
+        converted.append(target)
+
+    total_bytes = sum(os.path.getsize(f) for f in converted)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in converted:
+            load_raw_file(path)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'format': raw_format,
+        'files': len(converted),
+        'total_bytes': total_bytes,
+        'parse_seconds': statistics.median(timings)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='原始数据存储格式基准测试')
+    parser.add_argument('directory', nargs='?', default='json_data/raw_json_files',
+                        help='原始数据目录')
+    parser.add_argument('--repeat', type=int, default=20, help='每种格式重复解析的次数')
+    args = parser.parse_args()
+
+    source_files = list_raw_files(args.directory)
+    if not source_files:
+        print(f"❌ No raw data files found in {args.directory}")
+        sys.exit(1)
+
+    print(f"📊 Benchmarking {len(source_files)} raw files from {args.directory} (median of {args.repeat} runs)")
+
+    work_dir = tempfile.mkdtemp(prefix='raw_store_bench_')
+    try:
+        results = [benchmark_format(source_files, raw_format, work_dir, args.repeat)
+                   for raw_format in RAW_FORMATS]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = results[0]
+    print(f"\n{'format':<10} {'bytes on disk':>15} {'ratio':>8} {'parse (ms)':>12} {'speedup':>9}")
+    for result in results:
+        ratio = result['total_bytes'] / baseline['total_bytes']
+        speedup = baseline['parse_seconds'] / result['parse_seconds']
+        print(f"{result['format']:<10} {result['total_bytes']:>15,} {ratio:>8.2f} "
+              f"{result['parse_seconds'] * 1000:>12.1f} {speedup:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+数据点校验基准测试 - 比较原来的逐字段循环、逐条调用编译后的校验函数和整批校验的吞吐量
+"""
+
+import sys
+import time
+import argparse
+import statistics
+
+from raw_store import list_raw_files, load_raw_file
+from record_schema import DATA_POINT_SCHEMA, split_records, validate_data_point
+
+_PYTHON_TYPES = {'string': (str,), 'integer': (int,), 'number': (int, float), 'boolean': (bool,)}
+
+
+def legacy_count_valid(records):
+    """清理阶段原来的校验循环：含关键字段且至少有一个正数值的数据点计为有效"""
+    valid_data_points = 0
+    for item in records:
+        if isinstance(item, dict):
+            if any(key in item for key in ['conc', 'tpPerGpu', 'hwKey', 'precision']):
+                has_numeric_values = False
+                for key, value in item.items():
+                    if isinstance(value, (int, float)) and value > 0:
+                        has_numeric_values = True
+                        break
+
+                if has_numeric_values:
+                    valid_data_points += 1
+    return valid_data_points
+
+
+def _interpreted_field_ok(container, key, spec):
+    if key not in container:
+        return not spec.get('required')
+    value = container[key]
+    if isinstance(value, bool) and spec['type'] != 'boolean':
+        return False
+    if not isinstance(value, _PYTHON_TYPES[spec['type']]):
+        return False
+    if spec['type'] == 'number' and not (-float('inf') < value < float('inf')):
+        return False
+    if spec.get('non_empty') and not value:
+        return False
+    return 'minimum' not in spec or value >= spec['minimum']
+
+
+def interpreted_count_valid(records, schema=DATA_POINT_SCHEMA):
+    """同样的结构定义，每条数据点都遍历一遍结构定义（未编译）"""
+    valid_data_points = 0
+    metrics = schema['metrics']
+    for item in records:
+        if not isinstance(item, dict):
+            continue
+        if not all(_interpreted_field_ok(item, name, spec) for name, spec in schema['fields'].items()):
+            continue
+        ok = True
+        for name in metrics['fields']:
+            metric = item.get(name)
+            if metric is None:
+                continue
+            if not (isinstance(metric, dict) and _interpreted_field_ok(metric, 'y', metrics['value'])
+                    and _interpreted_field_ok(metric, 'roof', metrics['roof'])):
+                ok = False
+                break
+        if ok:
+            valid_data_points += 1
+    return valid_data_points
+
+
+def compiled_count_valid(records):
+    """逐条调用编译后的校验函数"""
+    return sum(validate_data_point(item) is None for item in records)
+
+
+def batch_count_valid(records):
+    """清理阶段的做法：整批快速路径，只逐条校验被挑出来的数据点"""
+    good, _ = split_records(records)
+    return len(good)
+
+
+def benchmark(name, count_valid, batches, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        valid = sum(count_valid(records) for records in batches)
+        timings.append(time.perf_counter() - start)
+
+    records = sum(len(records) for records in batches)
+    seconds = statistics.median(timings)
+    return {'name': name, 'records': records, 'valid': valid, 'seconds': seconds,
+            'records_per_second': records / seconds if seconds else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据点校验基准测试')
+    parser.add_argument('directory', nargs='?', default='json_data/raw_json_files',
+                        help='原始数据目录')
+    parser.add_argument('--repeat', type=int, default=20, help='每种校验方式重复的次数')
+    args = parser.parse_args()
+
+    source_files = list_raw_files(args.directory)
+    if not source_files:
+        print(f"❌ No raw data files found in {args.directory}")
+        sys.exit(1)
+
+    # 只比较校验本身，文件读取和JSON解析不计入耗时
+    batches = [load_raw_file(path).get('data', []) for path in source_files]
+    batches = [records for records in batches if isinstance(records, list)]
+    print(f"📊 Benchmarking validation of {sum(len(b) for b in batches):,} records "
+          f"from {len(batches)} files (median of {args.repeat} runs)")
+
+    results = [benchmark('legacy loop', legacy_count_valid, batches, args.repeat),
+               benchmark('interpreted schema', interpreted_count_valid, batches, args.repeat),
+               benchmark('compiled schema', compiled_count_valid, batches, args.repeat),
+               benchmark('compiled batch', batch_count_valid, batches, args.repeat)]
+
+    baseline = results[0]
+    print(f"\n{'validator':<19} {'valid':>8} {'time (ms)':>11} {'records/s':>14} {'speedup':>9}")
+    for result in results:
+        speedup = baseline['seconds'] / result['seconds'] if result['seconds'] else 0.0
+        print(f"{result['name']:<19} {result['valid']:>8,} {result['seconds'] * 1000:>11.2f} "
+              f"{result['records_per_second']:>14,.0f} {speedup:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,19 @@
 检查数据缺失问题的脚本
 """
 
-import json
 import os
 import pandas as pd
 from collections import defaultdict, Counter
 
+from raw_store import list_raw_files, load_raw_file
+
 def load_json_files():
     """加载所有JSON文件"""
     data_dir = "json_data/raw_json_files"
     all_data = []
 
-    for file_name in sorted(os.listdir(data_dir)):
-        if file_name.endswith('.json'):
-            file_path = os.path.join(data_dir, file_name)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                all_data.append(data)
+    for file_path in list_raw_files(data_dir):
+        all_data.append(load_raw_file(file_path))
 
     return all_data
 
@@ -102,13 +99,11 @@ def check_json_file_structure():
     data_dir = "json_data/raw_json_files"
 
     # 检查gpt-oss 120B相关文件
-    gpt_files = [f for f in os.listdir(data_dir) if 'gpt-oss' in f]
-
-    for file_name in sorted(gpt_files):
-        file_path = os.path.join(data_dir, file_name)
+    gpt_files = [f for f in list_raw_files(data_dir) if 'gpt-oss' in os.path.basename(f)]
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    for file_path in gpt_files:
+        file_name = os.path.basename(file_path)
+        data = load_raw_file(file_path)
 
         if 'metadata' in data:
             model = data['metadata']['model']
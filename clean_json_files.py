@@ -1,14 +1,94 @@
 #!/usr/bin/env python3
 import json
 import os
-import glob
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from raw_store import list_raw_files, load_raw_file, write_raw_file
+from record_schema import SCHEMA_FINGERPRINT, append_quarantine, schema_verdict, split_records
+
+# 校验结果缓存：路径 → 文件大小、修改时间、内容哈希和校验结果
+VALIDATION_CACHE_FILE = 'json_data/validation_cache.json'
+# 缓存文件格式变化时递增；校验规则的变化由结构定义指纹（SCHEMA_FINGERPRINT）区分，
+# 指纹不一致的旧缓存自动失效
+VALIDATION_CACHE_VERSION = 2
+
+def file_content_hash(filepath):
+    """文件原始字节的SHA-256（只读取，不解析JSON）"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_validation_cache(cache_file):
+    """读取校验结果缓存，不存在、损坏、版本或结构定义指纹不符时返回空缓存"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('version') != VALIDATION_CACHE_VERSION or cache.get('schema') != SCHEMA_FINGERPRINT:
+        return {}
+    return cache.get('files', {})
+
+def verdict_cache_entries(verdicts):
+    """把采集阶段对内存中数据得出的校验结论转换成校验缓存条目
+
+    ``verdicts`` 为 {文件路径: {'model', 'sequence', ..., 'validation'}}（见
+    api_scraper 结果中的 ``validated_files``）。只有结构定义指纹一致、所有
+    数据点都合格的文件可以直接使用结论，文件只做一次 stat；含不合格数据点
+    的文件仍需读取并隔离，不生成条目。条目不含内容哈希，文件改动后会重新分析。
+    """
+    entries = {}
+    for filepath, metadata in (verdicts or {}).items():
+        verdict = metadata.get('validation') or {}
+        if (verdict.get('schema') != SCHEMA_FINGERPRINT or verdict.get('invalid_records')
+                or not verdict.get('valid_data_points')):
+            continue
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            continue
+        if stat.st_size < 1024:
+            continue
+
+        entries[filepath] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_hash': None,
+            'result': {
+                'valid': True,
+                'file_size': stat.st_size,
+                'total_data_points': verdict['total_data_points'],
+                'valid_data_points': verdict['valid_data_points'],
+                'metadata': metadata
+            }
+        }
+    return entries
+
+def save_validation_cache(cache_file, results):
+    """保存有效文件的校验结果（无效文件会被删除，下次重新分析）"""
+    files = {
+        r['filepath']: {
+            'size': r['fingerprint']['size'],
+            'mtime_ns': r['fingerprint']['mtime_ns'],
+            'content_hash': r['fingerprint']['content_hash'],
+            'result': {k: v for k, v in r.items() if k not in ('filename', 'filepath', 'fingerprint', 'cached')}
+        }
+        for r in results if r['valid'] and r.get('fingerprint') and 'quarantine' not in r
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+    tmp_path = f"{cache_file}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': VALIDATION_CACHE_VERSION, 'schema': SCHEMA_FINGERPRINT, 'files': files}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_file)
+
 def analyze_json_file(filepath):
     """分析单个JSON文件的质量"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_raw_file(filepath)
 
         # 获取文件大小
         file_size = os.path.getsize(filepath)
@@ -38,26 +118,21 @@ def analyze_json_file(filepath):
                 'file_size': file_size
             }
 
-        # 检查data字段是否有有效数据点
-        valid_data_points = 0
-        for item in data_content:
-            if isinstance(item, dict):
-                # 检查是否包含关键的性能指标
-                if any(key in item for key in ['conc', 'tpPerGpu', 'hwKey', 'precision']):
-                    # 检查是否有数值数据
-                    has_numeric_values = False
-                    for key, value in item.items():
-                        if isinstance(value, (int, float)) and value > 0:
-                            has_numeric_values = True
-                            break
-
-                    if has_numeric_values:
-                        valid_data_points += 1
+        # 采集阶段已按同一结构定义校验过的文件直接使用元数据中的结论，否则逐批校验；
+        # 不合格的数据点交给 quarantine_invalid_records 隔离
+        metadata = data['metadata'] if isinstance(data['metadata'], dict) else {}
+        verdict = metadata.get('validation') or {}
+        if verdict.get('schema') == SCHEMA_FINGERPRINT and verdict.get('total_data_points') == len(data_content):
+            bad_records = [{'index': entry['index'], 'reason': entry['reason'], 'record': data_content[entry['index']]}
+                           for entry in verdict.get('invalid_records', [])]
+        else:
+            _, bad_records = split_records(data_content)
+        valid_data_points = len(data_content) - len(bad_records)
 
         if valid_data_points == 0:
             return {
                 'valid': False,
-                'reason': 'No valid data points with numeric values',
+                'reason': f"No data points pass schema validation ({bad_records[0]['reason']})",
                 'file_size': file_size,
                 'total_data_points': len(data_content)
             }
@@ -71,13 +146,16 @@ def analyze_json_file(filepath):
                 'valid_data_points': valid_data_points
             }
 
-        return {
+        result = {
             'valid': True,
             'file_size': file_size,
             'total_data_points': len(data_content),
             'valid_data_points': valid_data_points,
             'metadata': data.get('metadata', {})
         }
+        if bad_records:
+            result['quarantine'] = bad_records
+        return result
 
     except json.JSONDecodeError as e:
         return {
@@ -92,34 +170,129 @@ def analyze_json_file(filepath):
             'file_size': os.path.getsize(filepath) if os.path.exists(filepath) else 0
         }
 
-def analyze_all_files(directory):
-    """分析目录下所有JSON文件"""
-    json_files = glob.glob(os.path.join(directory, '*.json'))
-
-    # 排除README和summary文件
-    json_files = [f for f in json_files if not any(x in os.path.basename(f) for x in ['README', 'summary'])]
+def analyze_json_file_cached(filepath, cached=None):
+    """按内容哈希查缓存，内容与缓存一致（只是修改时间变了）时不再解析"""
+    try:
+        stat = os.stat(filepath)
+        content_hash = file_content_hash(filepath)
+    except OSError:
+        return analyze_json_file(filepath)
+
+    if cached and cached['content_hash'] == content_hash:
+        result = dict(cached['result'], cached=True)
+    else:
+        result = dict(analyze_json_file(filepath), cached=False)
+    result['fingerprint'] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'content_hash': content_hash}
+    return result
+
+def analyze_all_files(directory, workers=None, cache=None):
+    """分析目录下所有数据文件（.json 和 .json.gz）
+
+    ``workers`` 为并行分析的进程数，默认使用全部CPU，为1时在当前进程内
+    逐个分析。无论并行与否，结果都按文件名顺序返回。传入 ``cache``
+    （``load_validation_cache`` 的结果）时，路径、大小和修改时间都与缓存
+    一致的文件直接使用缓存结果，不读取文件；只有大小或修改时间变化的
+    文件再比较内容哈希，内容相同时同样跳过解析。
+    """
+    # 排除README、summary等报告文件
+    json_files = list_raw_files(directory)
+    cache = cache or {}
+
+    file_results = {}
+    pending = []
+    for filepath in json_files:
+        cached = cache.get(filepath)
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            stat = None
+        if cached and stat and (stat.st_size, stat.st_mtime_ns) == (cached['size'], cached['mtime_ns']):
+            file_results[filepath] = dict(cached['result'], cached=True, fingerprint={
+                'size': cached['size'], 'mtime_ns': cached['mtime_ns'], 'content_hash': cached['content_hash']})
+        else:
+            pending.append((filepath, cached))
+
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    print(f"📊 Analyzing {len(json_files)} JSON files..."
+          + (f" ({workers} processes)" if workers > 1 else ""))
+
+    paths = [filepath for filepath, _ in pending]
+    entries = [cached for _, cached in pending]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(pending) // (workers * 4))
+            file_results.update(zip(paths, executor.map(analyze_json_file_cached, paths, entries,
+                                                        chunksize=chunksize)))
+    else:
+        file_results.update(zip(paths, map(analyze_json_file_cached, paths, entries)))
 
     analysis_results = []
-
-    print(f"📊 Analyzing {len(json_files)} JSON files...")
-
     for filepath in json_files:
+        result = file_results[filepath]
         filename = os.path.basename(filepath)
         print(f"🔍 Analyzing: {filename}")
 
-        result = analyze_json_file(filepath)
         result['filename'] = filename
         result['filepath'] = filepath
         analysis_results.append(result)
 
         status = "✅ Valid" if result['valid'] else "❌ Invalid"
+        if result.get('cached'):
+            status += " (cached)"
         reason = result.get('reason', '')
         size = result.get('file_size', 0)
 
         print(f"   {status} - Size: {size:,} bytes - {reason}")
 
+    cached_count = sum(1 for r in analysis_results if r.get('cached'))
+    if cached_count:
+        print(f"♻️  {cached_count}/{len(analysis_results)} files served from the validation cache")
+
     return analysis_results
 
+def quarantine_invalid_records(results):
+    """把有效文件中不合格的数据点移到隔离文件，文件只保留合格的数据点
+
+    文件先写临时文件再原子替换；元数据记录隔离数量。content_hash 保持为
+    上游响应的哈希（增量刷新和“数据无变化”判断都依赖它），保留数据的哈希
+    另存在 retained_content_hash。返回隔离的数据点总数。
+    """
+    total = 0
+    for result in results:
+        bad_records = result.pop('quarantine', None)
+        if not bad_records:
+            continue
+
+        try:
+            file_data = load_raw_file(result['filepath'])
+            records = file_data.get('data', [])
+            bad_indexes = {entry['index'] for entry in bad_records}
+            good_records = [record for index, record in enumerate(records) if index not in bad_indexes]
+
+            metadata = dict(file_data.get('metadata', {}))
+            metadata['retained_content_hash'] = hashlib.sha256(json.dumps(
+                good_records, ensure_ascii=False, separators=(',', ':')).encode('utf-8')).hexdigest()
+            metadata['record_count'] = len(good_records)
+            metadata['quarantined_records'] = metadata.get('quarantined_records', 0) + len(bad_records)
+            metadata['validation'] = schema_verdict(len(good_records), [])
+
+            sidecar = append_quarantine(result['filepath'], bad_records)
+            write_raw_file(result['filepath'], metadata, good_records)
+        except Exception as e:
+            print(f"   ❌ Failed to quarantine records in {result['filename']}: {e}")
+            continue
+
+        # 文件已改写，这次不写入校验缓存，下次运行重新分析
+        result.pop('fingerprint', None)
+        result['file_size'] = os.path.getsize(result['filepath'])
+        result['total_data_points'] = len(good_records)
+        result['quarantined_records'] = len(bad_records)
+        result['metadata'] = metadata
+        total += len(bad_records)
+        print(f"   🚧 Quarantined {len(bad_records)} records from {result['filename']} → {os.path.basename(sidecar)}")
+
+    return total
+
 def remove_invalid_files(results, dry_run=True):
     """移除无效文件"""
     invalid_files = [r for r in results if not r['valid']]
@@ -141,6 +314,18 @@ def remove_invalid_files(results, dry_run=True):
 
     for result in invalid_files:
         try:
+            # 删除前把文件中的数据点全部移到隔离文件，不丢失原始数据
+            try:
+                records = load_raw_file(result['filepath']).get('data', [])
+            except Exception:
+                records = []
+            if isinstance(records, list) and records:
+                _, bad_records = split_records(records)
+                bad_indexes = {entry['index'] for entry in bad_records}
+                bad_records += [{'index': index, 'reason': None, 'record': record}
+                                for index, record in enumerate(records) if index not in bad_indexes]
+                append_quarantine(result['filepath'], sorted(bad_records, key=lambda entry: entry['index']),
+                                  reason=result['reason'])
             os.remove(result['filepath'])
             removed_files.append(result['filename'])
             print(f"   ✅ Removed: {result['filename']}")
@@ -153,6 +338,8 @@ def generate_cleanup_report(results, removed_files=None):
     """生成清理报告"""
     valid_files = [r for r in results if r['valid']]
     invalid_files = [r for r in results if not r['valid']]
+    cached_files = sum(1 for r in results if r.get('cached'))
+    quarantined_records = sum(r.get('quarantined_records', 0) for r in results)
 
     # 统计信息
     total_size = sum(r['file_size'] for r in results)
@@ -177,6 +364,8 @@ def generate_cleanup_report(results, removed_files=None):
             'valid_files': len(valid_files),
             'invalid_files': len(invalid_files),
             'removed_files': len(removed_files) if removed_files else 0,
+            'cached_files': cached_files,
+            'quarantined_records': quarantined_records,
             'total_size_bytes': total_size,
             'valid_size_bytes': valid_size,
             'invalid_size_bytes': invalid_size,
@@ -189,7 +378,8 @@ def generate_cleanup_report(results, removed_files=None):
                 'model': r.get('metadata', {}).get('model', 'Unknown'),
                 'sequence': r.get('metadata', {}).get('sequence', 'Unknown'),
                 'file_size_bytes': r['file_size'],
-                'data_points': r.get('valid_data_points', 0)
+                'data_points': r.get('valid_data_points', 0),
+                'quarantined_records': r.get('quarantined_records', 0)
             } for r in valid_files
         ],
         'invalid_files_detail': [
@@ -214,6 +404,8 @@ def generate_cleanup_report(results, removed_files=None):
 - **有效文件数**: {len(valid_files)}
 - **无效文件数**: {len(invalid_files)}
 - **已删除文件数**: {len(removed_files) if removed_files else 0}
+- **使用缓存校验结果的文件数**: {cached_files}
+- **隔离的数据点数**: {quarantined_records}（保存在对应文件旁的 *.quarantine.jsonl）
 - **原始总大小**: {total_size:,} bytes ({total_size/1024/1024:.2f} MB)
 - **有效数据大小**: {valid_size:,} bytes ({valid_size/1024/1024:.2f} MB)
 - **节省空间**: {invalid_size:,} bytes ({invalid_size/1024/1024:.2f} MB)
@@ -257,7 +449,12 @@ def generate_cleanup_report(results, removed_files=None):
 
     return report
 
-def main():
+def main(workers=None, verdicts=None):
+    """清理入口，``workers`` 为并行分析的进程数（默认使用全部CPU）
+
+    ``verdicts`` 为采集阶段得出的校验结论（api_scraper 结果中的 ``validated_files``），
+    对应文件不再读取和解析。
+    """
     directory = 'json_data/raw_json_files'
 
     if not os.path.exists(directory):
@@ -266,8 +463,19 @@ def main():
 
     print("🚀 Starting JSON file cleanup analysis...")
 
-    # 分析所有文件
-    results = analyze_all_files(directory)
+    # 分析所有文件（刚采集的文件使用采集时的结论，未变化的文件直接使用上次的校验结果）
+    cache = load_validation_cache(VALIDATION_CACHE_FILE)
+    collected = verdict_cache_entries(verdicts)
+    if collected:
+        print(f"🧾 Using collector verdicts for {len(collected)} freshly collected files")
+    cache.update(collected)
+    results = analyze_all_files(directory, workers, cache)
+
+    # 有效文件中不合格的数据点移到隔离文件，合格的数据点保留
+    quarantined = quarantine_invalid_records(results)
+    if quarantined:
+        print(f"🚧 Quarantined {quarantined} records that failed schema validation")
+    save_validation_cache(VALIDATION_CACHE_FILE, results)
 
     # 生成初始报告
     print("\n📊 Generating initial analysis report...")
@@ -292,17 +500,10 @@ def main():
     if removed_files:
         print(f"\n✅ Successfully removed {len(removed_files)} invalid files")
 
-        # 重新分析清理后的文件
-        print("\n📊 Re-analyzing files after cleanup...")
-        remaining_files = glob.glob(os.path.join(directory, '*.json'))
-        remaining_files = [f for f in remaining_files if not any(x in os.path.basename(f) for x in ['README', 'summary', 'cleanup', 'CLEANUP'])]
-
-        final_results = []
-        for filepath in remaining_files:
-            result = analyze_json_file(filepath)
-            result['filename'] = os.path.basename(filepath)
-            result['filepath'] = filepath
-            final_results.append(result)
+        # 剩余文件沿用第一次分析的结果，不再重新解析（删除失败的文件仍保留在结果中）
+        print("\n📊 Summarizing files after cleanup...")
+        removed = set(removed_files)
+        final_results = [r for r in results if r['filename'] not in removed]
 
         # 生成最终报告
         generate_cleanup_report(final_results, removed_files)
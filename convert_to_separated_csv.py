@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
-import json
 import os
-import glob
 import csv
 import re
 from datetime import datetime
 
+from raw_store import list_raw_files, load_raw_file
+
 def normalize_sequence_format(sequence_str):
     """将序列格式标准化为 1k-1k, 1k-8k 等格式"""
     normalized = sequence_str.replace(' ', '').lower()
@@ -15,8 +15,7 @@ def normalize_sequence_format(sequence_str):
 def categorize_json_file(filepath):
     """根据URL判断JSON文件类型"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_raw_file(filepath)
 
         url = data.get('metadata', {}).get('url', '')
 
@@ -39,8 +38,7 @@ def extract_all_fields(json_files):
 
     for filepath in json_files:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_raw_file(filepath)
 
             data_points = data.get('data', [])
             for point in data_points:
@@ -78,10 +76,8 @@ def flatten_data_point(data_point):
 
 def process_json_files_by_type(directory):
     """按类型处理JSON文件"""
-    # 查找所有JSON文件（排除报告文件）
-    json_files = glob.glob(os.path.join(directory, '*.json'))
-    json_files = [f for f in json_files if not any(x in os.path.basename(f).lower()
-                                               for x in ['readme', 'summary', 'cleanup', 'report'])]
+    # 查找所有数据文件（.json 和 .json.gz，排除报告文件）
+    json_files = list_raw_files(directory)
 
     print(f"📊 Found {len(json_files)} JSON files to process")
 
@@ -122,25 +118,34 @@ def convert_files_to_csv(files, file_type, output_file):
     all_fields = extract_all_fields(files)
     print(f"📋 Found {len(all_fields)} unique data fields for {file_type}")
 
-    # 定义CSV列的顺序
-    csv_columns = ['model_name', 'sequence_length'] + all_fields
+    # 精度变体的数据点可能缺少precision字段，由文件元数据补齐，保证输出中有精度维度
+    if 'precision' not in all_fields:
+        all_fields = sorted(all_fields + ['precision'])
+
+    # 定义CSV列的顺序；substituted/substituted_from 标记采集失败时使用的替代数据及其原始采集时间
+    csv_columns = ['model_name', 'sequence_length'] + all_fields + ['substituted', 'substituted_from']
 
     # 准备CSV数据
     csv_data = []
     total_records = 0
+    substituted_records = 0
 
     for i, filepath in enumerate(files):
         filename = os.path.basename(filepath)
         print(f"  📄 Processing {i+1}/{len(files)}: {filename}")
 
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
+            json_data = load_raw_file(filepath)
 
             # 提取元数据
             metadata = json_data.get('metadata', {})
             model_name = metadata.get('model', 'Unknown')
             sequence_length = normalize_sequence_format(metadata.get('sequence', 'Unknown'))
+            file_precision = metadata.get('precision')
+            if file_precision == 'default':
+                file_precision = None
+            substituted = bool(metadata.get('substituted'))
+            substituted_from = metadata.get('substituted_from', '') if substituted else ''
 
             # 处理数据点
             data_points = json_data.get('data', [])
@@ -161,17 +166,28 @@ def convert_files_to_csv(files, file_type, output_file):
                     # 添加所有数据字段
                     for field in all_fields:
                         csv_row[field] = flattened_point.get(field, '')
+                    if csv_row['precision'] in ('', None) and file_precision:
+                        csv_row['precision'] = file_precision
+
+                    csv_row['substituted'] = substituted
+                    csv_row['substituted_from'] = substituted_from
 
                     csv_data.append(csv_row)
                     file_records += 1
 
             total_records += file_records
-            print(f"    ✅ Extracted {file_records} data points")
+            if substituted:
+                substituted_records += file_records
+                print(f"    ⚠️  Extracted {file_records} data points (last-known-good data from {substituted_from})")
+            else:
+                print(f"    ✅ Extracted {file_records} data points")
 
         except Exception as e:
             print(f"    ❌ Error processing {filename}: {e}")
 
     print(f"📊 Total {file_type} records extracted: {total_records}")
+    if substituted_records:
+        print(f"⚠️  {substituted_records} {file_type} records come from last-known-good data")
 
     # 保存CSV文件
     if save_csv_file(csv_columns, csv_data, output_file):
@@ -327,6 +343,8 @@ def create_readable_summary(summary):
 - **conc**: 并发数
 - **hwKey**: 硬件平台标识
 - **precision**: 精度类型 (FP8/FP4)
+- **substituted**: 是否为采集失败时替代的上次有效数据 (True/False)
+- **substituted_from**: 替代数据的原始采集时间
 - **tp**: 张量并行数
 - **costh_y**: P50延迟 (毫秒)
 - **costn_y**: P90延迟 (毫秒)
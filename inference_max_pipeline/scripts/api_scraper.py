@@ -7,19 +7,124 @@ import requests
 import json
 import time
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Tuple, Optional
+from urllib.parse import urlparse
 import logging
+import threading
+
+from columnar import ColumnarPayload, decode_json_stream
+from coverage_stats import CoverageAccumulator
+from endpoint_manifest import EndpointManifest
+from hedging import RequestHedger
+from http_client import PooledHTTPClient, release_response
+from rate_limiter import TokenBucket
+from http_cache import HTTPValidatorCache
+from last_known_good import LastKnownGoodPolicy, substitution_metadata
+from payload_validation import StreamValidator
+from refresh_policy import RefreshPolicy
+from retry_policy import RetryPolicy, CircuitBreaker, CircuitOpenError
+from transfer_metrics import (new_request_metrics, summarize as summarize_transfers,
+                              timed_chunks, write_prometheus_textfile)
+
+# 项目根目录中的共享模块（原始数据存储格式）
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from raw_store import (DEFAULT_RAW_FORMAT, RAW_FORMATS, load_raw_file, raw_file_path, remove_temp_files,
+                       write_raw_file)
+from raw_writer import RawFileWriterPool
+
+DEFAULT_API_BASE_URL = "https://inferencemax.semianalysis.com/data/inference-performance"
 
 class APIDataCollector:
     """API数据采集器"""
 
-    def __init__(self):
-        self.base_url = "https://inferencemax.semianalysis.com/data/inference-performance"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, config: Optional[Dict] = None, http_client: Optional[PooledHTTPClient] = None):
+        self.config = config or {}
+        performance = self.config.get('performance', {})
+        source = self.config.get('source', {})
+
+        self.base_url = source.get('api_base_url', DEFAULT_API_BASE_URL).rstrip('/')
+        # 清单和HTTP缓存的相对路径相对于 paths.base_dir，与采集器创建时的工作目录无关
+        self.base_dir = self.config.get('paths', {}).get('base_dir')
+        self.max_workers = max(1, int(performance.get('max_concurrent_downloads', 1)))
+        self.request_timeout = performance.get('request_timeout', 30)
+
+        # 共享令牌桶限速（performance.rate_limit），所有采集线程、探测和对冲请求共用
+        rate_limit = performance.get('rate_limit', {})
+        self.rate_limiter = None
+        if rate_limit.get('requests_per_second'):
+            self.rate_limiter = TokenBucket(rate_limit['requests_per_second'], rate_limit.get('burst', 1))
+
+        # 对冲请求（performance.hedging），慢请求超过近期延迟分位数时发出备份请求
+        hedging = performance.get('hedging', {})
+        self.hedger = None
+        if hedging.get('enabled', False):
+            self.hedger = RequestHedger(
+                max_workers=self.max_workers,
+                percentile=hedging.get('percentile', 95),
+                min_samples=hedging.get('min_samples', 5),
+                max_hedge_ratio=hedging.get('max_hedge_ratio', 0.2)
+            )
+
+        # 带连接池的HTTP会话：调度器守护进程注入共享实例，keep-alive 连接跨运行复用；
+        # 未注入时自行创建（performance.connection_pool_size，默认与并发数一致，对冲时翻倍）
+        self.owns_http_client = http_client is None
+        self.http_client = http_client or PooledHTTPClient(self.config)
+        self.session = self.http_client.session
+        self._pool_baseline = self.http_client.begin_run()
+
+        # HTTP条件请求缓存（cache.http_cache_enabled），命中304时复用上次的响应体
+        cache_config = self.config.get('cache', {})
+        self.http_cache = None
+        if cache_config.get('http_cache_enabled', False):
+            self.http_cache = HTTPValidatorCache(
+                self.data_path(cache_config.get('http_cache_dir', 'json_data/http_cache')))
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+
+        # 重试与熔断（source.retry_attempts / source.retry_delay）
+        self.retry_policy = RetryPolicy(
+            max_attempts=source.get('retry_attempts', 1),
+            base_delay=source.get('retry_delay', 5),
+            max_delay=source.get('retry_max_delay', 60)
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=source.get('circuit_breaker_threshold', 5),
+            cooldown=source.get('circuit_breaker_cooldown', 60)
+        )
+        self.request_stats = {'retries': 0, 'circuit_rejections': 0, 'validation_failures': 0, 'refetches': 0}
+        # 响应体校验失败（截断/格式错误）后对该组合重新下载的次数
+        self.refetch_attempts = max(0, int(source.get('refetch_attempts', 1)))
+
+        # 端点清单（discovery.enabled），正常运行直接使用清单中探测成功的URL
+        discovery = self.config.get('discovery', {})
+        self.manifest = None
+        if discovery.get('enabled', False):
+            self.manifest = EndpointManifest(
+                self.data_path(discovery.get('manifest_file', 'json_data/endpoint_manifest.json')), self.base_url)
+        self.discovery_precisions = discovery.get('precisions', ['fp8', 'fp4'])
+
+        # 每个模型要采集的精度变体（targets.precisions），第一个为主精度
+        self.model_precisions = self.config.get('targets', {}).get('precisions') or {}
+        self.manifest_max_age_hours = discovery.get('max_age_hours', 168)
+
+        # 原始数据文件格式（storage.raw_format）
+        storage = self.config.get('storage', {})
+        self.raw_format = storage.get('raw_format', DEFAULT_RAW_FORMAT)
+
+        # 后台写入线程池（storage.writer_threads），为0时在采集线程内同步写入
+        writer_threads = int(storage.get('writer_threads', 2))
+        self.writer_pool = RawFileWriterPool(writer_threads) if writer_threads > 0 else None
+
+        # 按组合的有效期（refresh），有效期内沿用已有的原始数据文件
+        self.refresh_policy = RefreshPolicy(self.config.get('refresh', {}))
+        self.refresh_stats = {'fetched': 0, 'reused': 0}
+
+        # 失败组合的兜底（fallback），用最近一次通过校验的数据替代
+        self.fallback = LastKnownGoodPolicy(self.config.get('fallback', {}))
 
     def normalize_model_name(self, model: str) -> str:
         """标准化模型名称用于URL"""
@@ -38,112 +143,747 @@ class APIDataCollector:
         # 处理 "1K / 1K" -> "1k_1k", "1K / 8K" -> "1k_8k", "8K / 1K" -> "8k_1k"
         return sequence.lower().replace(' ', '').replace('/', '_')
 
-    def _generate_url(self, model: str, sequence: str, data_type: str, precision: str = 'fp8') -> str:
-        """生成请求URL，与fetch_data方法保持一致"""
+    def data_path(self, path: str) -> str:
+        """把配置中的相对路径解析到 ``paths.base_dir`` 下（未配置时保持原样）"""
+        if self.base_dir and not os.path.isabs(path):
+            return os.path.join(self.base_dir, path)
+        return path
+
+    def precisions_for(self, model: str) -> List[str]:
+        """模型要采集的精度变体，第一个为主精度
+
+        未在 ``targets.precisions`` 中配置的模型沿用原有规则：Llama 使用 fp8，
+        其他模型使用不带精度的URL（``default``）。
+        """
+        precisions = self.model_precisions.get(model)
+        if precisions:
+            return list(precisions)
+        return ['fp8'] if 'llama' in model.lower() else [EndpointManifest.DEFAULT_PRECISION]
+
+    def variant_suffix(self, model: str, precision: Optional[str]) -> Optional[str]:
+        """非主精度变体的文件名后缀；主精度沿用原有文件名"""
+        if precision is None or precision == self.precisions_for(model)[0]:
+            return None
+        return precision
+
+    def variant_key(self, data_type: str, model: str, precision: Optional[str]) -> str:
+        """结果中的数据类型键：主精度沿用原有的键，其他精度变体带精度后缀"""
+        suffix = self.variant_suffix(model, precision)
+        return f"{data_type}|{suffix}" if suffix else data_type
+
+    def _generate_url(self, model: str, sequence: str, data_type: str, precision: Optional[str] = None) -> str:
+        """生成请求URL，与fetch_data方法保持一致（精度为空时使用模型的主精度）"""
         model_url = self.normalize_model_name(model)
+        precision = precision or self.precisions_for(model)[0]
+        infix = '' if precision == EndpointManifest.DEFAULT_PRECISION else f"-{precision}"
 
         if 'llama' in model_url.lower():
             sequence_url = self.normalize_llama_sequence_name(sequence)
-            return f"{self.base_url}/{model_url}-{precision}-{sequence_url}-{data_type}.json"
         else:
             sequence_url = self.normalize_sequence_name(sequence)
-            return f"{self.base_url}/{model_url}-{sequence_url}-{data_type}.json"
+        return f"{self.base_url}/{model_url}{infix}-{sequence_url}-{data_type}.json"
+
+    def missing_since(self, model: str, sequence: str, data_type: str) -> Optional[str]:
+        """端点清单确认该组合上游不存在（全部候选URL 404/410）时返回首次确认的时间"""
+        if self.manifest is None:
+            return None
+        return self.manifest.missing_since(model, sequence, data_type, self.manifest_max_age_hours)
+
+    def resolve_url(self, model: str, sequence: str, data_type: str,
+                    precision: Optional[str] = None) -> Optional[str]:
+        """优先从端点清单取URL，清单中没有时回退到内置的URL规则
 
-    def fetch_data(self, model: str, sequence: str, data_type: str, precision: str = 'fp8') -> Tuple[Optional[List], bool]:
-        """获取指定数据"""
+        主精度允许回退到清单中的其他变体，但不回退到作为精度变体单独采集的
+        URL（否则同一份数据会以两个精度标签各保存一次）；其余精度变体只使用
+        同精度的URL。清单确认上游不存在的组合返回None，不再猜测URL。
+        """
+        precisions = self.precisions_for(model)
+        precision = precision or precisions[0]
+        if self.missing_since(model, sequence, data_type):
+            return None
+        if self.manifest:
+            strict = precision != precisions[0]
+            url = self.manifest.get_url(model, sequence, data_type, precision, strict=strict,
+                                        exclude=[other for other in precisions if other != precision])
+            if url:
+                return url
+        return self._generate_url(model, sequence, data_type, precision)
+
+    def variant_available(self, model: str, sequence: str, data_type: str, precision: str) -> bool:
+        """端点清单是否显示该精度变体存在（主精度和未探测过的组合总是尝试采集，
+        确认上游不存在的组合不采集）"""
+        if self.manifest is None:
+            return True
+        if self.missing_since(model, sequence, data_type):
+            return False
+        if precision == self.precisions_for(model)[0]:
+            return True
+        variants = self.manifest.get_variants(model, sequence, data_type)
+        return not variants or precision in variants
+
+    def candidate_urls(self, model: str, sequence: str, data_type: str) -> Dict[str, List[str]]:
+        """列出一个组合所有可能的URL写法，按精度标签分组"""
         model_url = self.normalize_model_name(model)
+        sequence_urls = []
+        for sequence_url in (self.normalize_sequence_name(sequence),
+                             self.normalize_llama_sequence_name(sequence)):
+            if sequence_url not in sequence_urls:
+                sequence_urls.append(sequence_url)
 
-        # 为Llama模型使用特殊的序列名称格式
-        if 'llama' in model_url.lower():
-            sequence_url = self.normalize_llama_sequence_name(sequence)
-            url = f"{self.base_url}/{model_url}-{precision}-{sequence_url}-{data_type}.json"
-        else:
-            sequence_url = self.normalize_sequence_name(sequence)
-            url = f"{self.base_url}/{model_url}-{sequence_url}-{data_type}.json"
+        precisions = [EndpointManifest.DEFAULT_PRECISION]
+        for precision in list(self.discovery_precisions) + self.precisions_for(model):
+            if precision not in precisions:
+                precisions.append(precision)
 
-        try:
-            response = self.session.get(url, timeout=30)
+        candidates = {}
+        for precision in precisions:
+            infix = '' if precision == EndpointManifest.DEFAULT_PRECISION else f"-{precision}"
+            candidates[precision] = [
+                f"{self.base_url}/{model_url}{infix}-{sequence_url}-{data_type}.json"
+                for sequence_url in sequence_urls
+            ]
+        return candidates
+
+    def _probe_url(self, url: str) -> Optional[bool]:
+        """探测URL是否可用（只读取响应头）
+
+        与正式请求一样经过重试策略和主机熔断。返回True表示存在，False表示
+        确定不存在（404/410），None表示无法判断（429/5xx、超时、熔断等），
+        这类结果不能当作端点不存在写入清单。
+        """
+        response = self._get_with_retry(url)
+        if response is None:
+            return None
+        release_response(response)
+        if response.status_code == 200:
+            return True
+        if response.status_code in (404, 410):
+            return False
+        return None
 
-            if response.status_code == 200:
-                data = response.json()
-                return data, True
+    def discover_endpoints(self, models: List[str], sequences: List[str],
+                           data_types: Optional[List[str]] = None) -> Dict:
+        """并行探测所有候选URL，把可用的写入端点清单"""
+        if self.manifest is None:
+            raise ValueError("Endpoint discovery requires discovery.enabled in the config")
+
+        data_types = data_types or ["e2e", "interactivity"]
+        probes = []
+        for model in models:
+            for sequence in sequences:
+                for data_type in data_types:
+                    for precision, urls in self.candidate_urls(model, sequence, data_type).items():
+                        for url in urls:
+                            probes.append((model, sequence, data_type, precision, url))
+
+        print(f"🔎 Probing {len(probes)} candidate URLs with up to {self.max_workers} workers...")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            resolved = list(executor.map(lambda probe: self._probe_url(probe[4]), probes))
+
+        found = {}
+        inconclusive = {}
+        for (model, sequence, data_type, precision, url), ok in zip(probes, resolved):
+            key = (model, sequence, data_type)
+            variants = found.setdefault(key, {})
+            if ok and precision not in variants:
+                variants[precision] = url
+            elif ok is None:
+                inconclusive.setdefault(key, set()).add(precision)
+
+        # 某个精度没有探测成功的URL、又有探测结果无法判断时，整个组合不写入清单：
+        # 下次运行重新探测，在此之前所有精度变体都会尝试采集
+        missing = []
+        transient = []
+        for (model, sequence, data_type), variants in found.items():
+            unknown = inconclusive.get((model, sequence, data_type), set()) - set(variants)
+            if unknown:
+                self.manifest.set_variants(model, sequence, data_type, {})
+                transient.append(EndpointManifest.make_key(model, sequence, data_type))
+                logging.warning(f"Probes for {model} + {sequence} ({data_type}) were inconclusive "
+                                f"for {', '.join(sorted(unknown))}; leaving it unresolved until the next discovery")
+                continue
+
+            if variants:
+                self.manifest.set_variants(model, sequence, data_type, variants)
             else:
-                logging.warning(f"HTTP {response.status_code} for {url}")
-                return None, False
+                # 所有候选URL都确定返回 404/410：写入否定条目，有效期内不再探测和采集
+                self.manifest.set_missing(model, sequence, data_type)
+                missing.append(EndpointManifest.make_key(model, sequence, data_type))
+                logging.warning(f"No endpoint found for {model} + {sequence} ({data_type})")
 
-        except Exception as e:
-            logging.error(f"Failed to fetch {url}: {str(e)}")
+        self.manifest.save()
+
+        resolved_count = sum(len(self.manifest.get_variants(*key)) for key in found)
+        print(f"✅ Discovered {resolved_count} endpoints, {len(missing)} combinations unresolved"
+              + (f", {len(transient)} left for re-probing after transient errors" if transient else ""))
+        print(f"📋 Manifest saved: {self.manifest.manifest_file}")
+
+        return {
+            'probed_urls': len(probes),
+            'resolved_endpoints': resolved_count,
+            'unresolved_combinations': missing,
+            'transient_combinations': transient
+        }
+
+    def ensure_manifest(self, models: List[str], sequences: List[str]):
+        """清单缺失、过期或缺少目标组合时先执行一次探测"""
+        if self.manifest is None:
+            return
+
+        keys = [EndpointManifest.make_key(model, sequence, data_type)
+                for model in models for sequence in sequences
+                for data_type in ["e2e", "interactivity"]]
+        if self.manifest.needs_discovery(keys, self.manifest_max_age_hours):
+            self.discover_endpoints(models, sequences)
+
+    def fetch_data(self, model: str, sequence: str, data_type: str,
+                   precision: Optional[str] = None, metrics: Optional[Dict] = None) -> Tuple[Optional[ColumnarPayload], bool]:
+        """获取指定数据
+
+        响应体按块流式解码为 ColumnarPayload，不在内存中保留完整的响应文本
+        和字典列表。下载过程中同时校验 Content-Length 和数据结构，截断或
+        格式错误的响应立即中止，并只对该组合重新完整下载（最多
+        ``source.refetch_attempts`` 次）。传入 ``metrics`` 时记录该请求的
+        状态码、建连、首字节、传输、解码耗时和解码后的字节数。
+        """
+        url = self.resolve_url(model, sequence, data_type, precision)
+        metrics = metrics if metrics is not None else new_request_metrics(url)
+        metrics['url'] = url
+        if url is None:
+            logging.info(f"Not fetching {model} + {sequence} ({data_type}): not found upstream "
+                         f"since {self.missing_since(model, sequence, data_type)}")
             return None, False
 
-    def analyze_data(self, data: List[Dict]) -> Dict:
-        """分析数据统计信息"""
-        if not data:
-            return {
-                'record_count': 0,
-                'hwkeys': set(),
-                'b200_trt_count': 0,
-                'has_b200_trt': False
-            }
+        use_cache = True
+        for attempt in range(1, self.refetch_attempts + 2):
+            try:
+                payload = self._fetch_once(url, metrics, use_cache)
+                return payload, payload is not None
+
+            # PayloadValidationError 与JSON解析错误都是 ValueError
+            except (ValueError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.ConnectionError) as e:
+                self._increment_stat(self.request_stats, 'validation_failures')
+                if attempt > self.refetch_attempts:
+                    logging.error(f"Invalid payload from {url} after {attempt} attempts: {e}")
+                    return None, False
+                self._increment_stat(self.request_stats, 'refetches')
+                logging.warning(f"Invalid payload from {url} ({e}), re-fetching")
+                # 重新下载时不发条件请求，避免再次使用可能有问题的缓存体
+                use_cache = False
+
+            except Exception as e:
+                logging.error(f"Failed to fetch {url}: {str(e)}")
+                return None, False
+
+        return None, False
+
+    def _fetch_once(self, url: str, metrics: Dict, use_cache: bool = True) -> Optional[ColumnarPayload]:
+        """请求并流式解码一次；HTTP错误返回None，响应体校验失败时抛出异常"""
+        headers = self.http_cache.conditional_headers(url) if self.http_cache and use_cache else {}
+        response = self._get_with_retry(url, headers)
+        if response is None:
+            return None
+        self._record_response_timing(response, metrics)
+
+        if response.status_code == 304 and self.http_cache:
+            release_response(response)
+            cached_chunks = self.http_cache.iter_body(url)
+            if cached_chunks is not None:
+                self._record_cache_result(hit=True)
+                metrics['cache'] = 'hit'
+                logging.info(f"HTTP 304 Not Modified, using cached body for {url}")
+                return self._decode_timed(cached_chunks, metrics, StreamValidator())
+
+            # 缓存体丢失，去掉条件头重新完整下载
+            response = self._get_with_retry(url)
+            if response is None:
+                return None
+            self._record_response_timing(response, metrics)
+
+        if response.status_code == 200:
+            return self._decode_response(url, response, metrics)
 
-        hwkeys = set()
-        b200_trt_count = 0
+        logging.warning(f"HTTP {response.status_code} for {url}")
+        release_response(response)
+        return None
 
-        for item in data:
-            hwkey = item.get('hwKey', '')
-            hwkeys.add(str(hwkey))
-            if 'b200_trt' in str(hwkey).lower():
-                b200_trt_count += 1
+    @staticmethod
+    def _record_response_timing(response: requests.Response, metrics: Dict):
+        """记录响应的状态码、建连耗时和首字节耗时（重试时以最后一次为准）"""
+        metrics['status'] = response.status_code
+        metrics['connect_seconds'] = getattr(response, 'connect_seconds', 0.0)
+        metrics['ttfb_seconds'] = response.elapsed.total_seconds()
+
+    @staticmethod
+    def _decode_timed(chunks, metrics: Dict, validator: StreamValidator) -> ColumnarPayload:
+        """流式解码并校验，把总耗时拆分为传输（等待数据块）和解码两部分"""
+        metrics['transfer_seconds'] = 0.0
+        start = time.perf_counter()
+        payload = decode_json_stream(timed_chunks(chunks, metrics), validate=validator.check_item)
+        validator.finish()
+        payload.verdict = validator.verdict()
+        metrics['decode_seconds'] = max(0.0, time.perf_counter() - start - metrics['transfer_seconds'])
+        metrics['bytes'] = payload.raw_size
+        return payload
+
+    def _decode_response(self, url: str, response: requests.Response,
+                         metrics: Optional[Dict] = None) -> ColumnarPayload:
+        """流式解码并校验200响应，启用缓存时同时把原始字节写入HTTP缓存
+
+        只有完整通过校验的响应体才会提交到HTTP缓存。写入HTTP缓存的耗时
+        计入传输时间，解码时间只包含JSON解析。
+        """
+        metrics = metrics if metrics is not None else new_request_metrics(url)
+        validator = StreamValidator.for_response(response.headers)
+        chunks = validator.wrap_chunks(response.iter_content(chunk_size=64 * 1024))
+        writer = None
+        if self.http_cache:
+            self._record_cache_result(hit=False)
+            metrics['cache'] = 'miss'
+            writer = self.http_cache.open_writer(url, response.headers.get('ETag'),
+                                                 response.headers.get('Last-Modified'))
+            if writer:
+                chunks = writer.tee(chunks)
+
+        try:
+            payload = self._decode_timed(chunks, metrics, validator)
+        except Exception:
+            if writer:
+                writer.abort()
+            raise
+        finally:
+            response.close()
+
+        if writer:
+            writer.commit()
+        return payload
+
+    def _get_with_retry(self, url: str, headers: Optional[Dict] = None) -> Optional[requests.Response]:
+        """带指数退避重试和主机熔断的GET请求
+
+        网络异常和 429/5xx 会按重试策略重试；其他状态码直接返回给调用方。
+        重试等待只占用当前采集线程，不影响其他并发请求。重试耗尽时返回最后
+        一次的响应（网络异常则为None），主机熔断中时立即返回None。
+        """
+        host = urlparse(url).netloc
+        max_attempts = self.retry_policy.max_attempts
+        response = None
+        error = ''
+
+        for attempt in range(1, max_attempts + 1):
+            try:
+                self.circuit_breaker.check(host)
+            except CircuitOpenError as e:
+                self._increment_stat(self.request_stats, 'circuit_rejections')
+                logging.warning(f"{e}; skipping {url}")
+                return None
+
+            try:
+                response = self._send(url, headers)
+            except requests.RequestException as e:
+                response = None
+                error = str(e)
+                self.circuit_breaker.record_failure(host)
+            else:
+                if not self.retry_policy.is_retryable_status(response.status_code):
+                    self.circuit_breaker.record_success(host)
+                    return response
+                error = f"HTTP {response.status_code}"
+                self.circuit_breaker.record_failure(host)
+                if attempt < max_attempts:
+                    release_response(response)
+
+            if attempt < max_attempts:
+                delay = self.retry_policy.backoff(attempt)
+                logging.warning(f"Attempt {attempt}/{max_attempts} failed for {url} ({error}), "
+                                f"retrying in {delay:.1f}s")
+                self._increment_stat(self.request_stats, 'retries')
+                time.sleep(delay)
+
+        logging.error(f"Giving up on {url} after {max_attempts} attempts: {error}")
+        return response
+
+    def _send(self, url: str, headers: Optional[Dict] = None) -> requests.Response:
+        """发送一次GET请求；启用对冲时由对冲器决定是否发出备份请求
+
+        请求以 ``stream=True`` 发送，对冲只覆盖收到响应头之前的时间。
+        """
+        def send():
+            return self.session.get(url, timeout=self.request_timeout, headers=headers, stream=True)
+
+        if self.hedger is None:
+            self._throttle()
+            return send()
+        return self.hedger.run(send, discard=lambda response: response.close(), throttle=self._throttle)
+
+    def _throttle(self):
+        """发出请求前从共享令牌桶取令牌（未配置限速时不等待）"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+
+    def _increment_stat(self, stats: Dict, key: str):
+        """线程安全地累加统计计数"""
+        with self._stats_lock:
+            stats[key] += 1
+
+    def _record_cache_result(self, hit: bool):
+        """线程安全地累加缓存命中/未命中计数"""
+        self._increment_stat(self.cache_stats, 'hits' if hit else 'misses')
+
+    def analyze_data(self, data: ColumnarPayload) -> Dict:
+        """分析数据统计信息（基于解码时单遍累计的覆盖度直方图）"""
+        coverage = data.coverage
+        b200_trt_count = coverage.count_matching('hwKey', 'b200_trt')
 
         return {
-            'record_count': len(data),
-            'hwkeys': hwkeys,
+            'record_count': coverage.record_count,
+            'hwkeys': coverage.hwkeys,
             'b200_trt_count': b200_trt_count,
-            'has_b200_trt': b200_trt_count > 0
+            'has_b200_trt': b200_trt_count > 0,
+            'coverage': coverage.to_dict()
         }
 
-    def save_json_file(self, data: List[Dict], model: str, sequence: str, data_type: str,
-                      output_dir: str, response_index: int = 1) -> str:
-        """保存JSON文件"""
-        os.makedirs(output_dir, exist_ok=True)
-
+    def raw_file_stem(self, model: str, sequence: str, data_type: str, response_index: int,
+                      variant: Optional[str] = None) -> str:
+        """组合对应的原始数据文件名（不含格式扩展名），非主精度变体带精度后缀"""
         model_safe = model.replace(' ', '_').replace('.', '_')
         sequence_safe = sequence.replace(' ', '_').replace('/', '___')
+        stem = f"{response_index:02d}_{model_safe}_{sequence_safe}_{data_type}"
+        return f"{stem}_{variant}" if variant else stem
 
-        filename = f"{response_index:02d}_{model_safe}_{sequence_safe}_{data_type}.json"
-        filepath = os.path.join(output_dir, filename)
-
-        # 分析数据
-        analysis = self.analyze_data(data)
-
-        file_data = {
-            'metadata': {
-                'combination_index': response_index,
-                'model': model,
-                'sequence': sequence,
-                'response_index': response_index,
-                'timestamp': datetime.now().isoformat(),
-                'request_id': response_index,
-                'url': self._generate_url(model, sequence, data_type),
-                'method': 'GET',
-                'content_type': 'application/json',
-                'data_size': len(json.dumps(data)),
-                'data_type': data_type,
-                'record_count': analysis['record_count'],
-                'b200_trt_count': analysis['b200_trt_count'],
-                'hwkeys': sorted(list(analysis['hwkeys']))
-            },
-            'data': data
+    def load_fresh_file(self, model: str, sequence: str, data_type: str,
+                        output_dir: str, response_index: int,
+                        precision: Optional[str] = None) -> Optional[Dict]:
+        """有效期内的已有原始数据文件，返回对应的结果条目；没有可沿用的文件时返回None"""
+        stem = self.raw_file_stem(model, sequence, data_type, response_index,
+                                  self.variant_suffix(model, precision))
+        for raw_format in RAW_FORMATS:
+            filepath = raw_file_path(output_dir, stem, raw_format)
+            if not os.path.exists(filepath):
+                continue
+
+            age_hours = (time.time() - os.path.getmtime(filepath)) / 3600
+            if not self.refresh_policy.is_fresh(model, sequence, data_type, age_hours):
+                return None
+
+            try:
+                metadata = load_raw_file(filepath).get('metadata', {})
+            except Exception as e:
+                logging.warning(f"Cannot reuse {filepath}: {e}")
+                return None
+
+            # 旧版本写入的文件缺少哈希和覆盖度统计，替代数据也不能当作有效期内的数据，需要重新采集
+            if not metadata.get('content_hash') or 'coverage' not in metadata or metadata.get('substituted'):
+                return None
+
+            return {
+                'success': True,
+                'record_count': metadata.get('record_count', 0),
+                'b200_trt_count': metadata.get('b200_trt_count', 0),
+                'hwkeys': metadata.get('hwkeys', []),
+                'filepath': filepath,
+                'content_hash': metadata['content_hash'],
+                'precision': metadata.get('precision', precision),
+                'coverage': {
+                    'record_count': metadata.get('record_count', 0),
+                    'histograms': metadata['coverage']
+                },
+                'reused': True,
+                'age_hours': round(age_hours, 2)
+            }
+        return None
+
+    def save_json_file(self, data: ColumnarPayload, model: str, sequence: str, data_type: str,
+                      output_dir: str, response_index: int = 1, url: Optional[str] = None,
+                      analysis: Optional[Dict] = None, metrics: Optional[Dict] = None,
+                      precision: Optional[str] = None, substitution: Optional[Dict] = None) -> str:
+        """保存数据文件（格式由 storage.raw_format 决定）
+
+        启用写入线程池时只排队写入并立即返回文件路径，文件在 ``flush_writes``
+        之后才保证存在；传入 ``metrics`` 时记录写文件耗时。``substitution``
+        为替代数据的标记参数（见 ``substitution_metadata``）。
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        precision = precision or self.precisions_for(model)[0]
+        stem = self.raw_file_stem(model, sequence, data_type, response_index,
+                                  self.variant_suffix(model, precision))
+        filepath = raw_file_path(output_dir, stem, self.raw_format)
+        filename = os.path.basename(filepath)
+
+        if analysis is None:
+            analysis = self.analyze_data(data)
+
+        metadata = {
+            'combination_index': response_index,
+            'model': model,
+            'sequence': sequence,
+            'response_index': response_index,
+            'timestamp': datetime.now().isoformat(),
+            'request_id': response_index,
+            'url': url or self._generate_url(model, sequence, data_type, precision),
+            'method': 'GET',
+            'content_type': 'application/json',
+            'data_size': data.raw_size,
+            'content_hash': data.content_hash,
+            'data_type': data_type,
+            'precision': precision,
+            'record_count': analysis['record_count'],
+            'b200_trt_count': analysis['b200_trt_count'],
+            'hwkeys': sorted(list(analysis['hwkeys'])),
+            'coverage': analysis['coverage']['histograms']
         }
+        if data.verdict:
+            metadata['validation'] = data.verdict
+        if substitution:
+            metadata = substitution_metadata(metadata, **substitution)
+
+        # 逐条写出数据点，不构建完整的字典列表
+        if self.writer_pool and not substitution:
+            self.writer_pool.submit(filepath, metadata, data.iter_records(), metrics)
+            logging.info(f"Queued: {filename} ({analysis['record_count']} records, {analysis['b200_trt_count']} b200_trt)")
+            return filepath
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(file_data, f, indent=2, ensure_ascii=False)
+        write_start = time.perf_counter()
+        write_raw_file(filepath, metadata, data.iter_records())
+        if metrics is not None:
+            metrics['write_seconds'] = time.perf_counter() - write_start
 
         logging.info(f"Saved: {filename} ({analysis['record_count']} records, {analysis['b200_trt_count']} b200_trt)")
         return filepath
 
+    def close(self):
+        """释放本次运行的写入线程池、对冲线程池和自行创建的HTTP客户端
+
+        调度器守护进程在同一进程中反复运行，每次运行的采集器都必须关闭，否则
+        线程会随运行次数累积；注入的共享HTTP客户端由调度器在退出时关闭。
+        """
+        if self.writer_pool:
+            self.writer_pool.shutdown()
+        if self.hedger:
+            self.hedger.shutdown()
+        if self.owns_http_client:
+            self.http_client.close()
+
+    def flush_writes(self) -> Dict[str, BaseException]:
+        """等待后台写入全部完成，返回写入失败的 {文件路径: 异常}"""
+        if self.writer_pool is None:
+            return {}
+        failures = self.writer_pool.flush()
+        for filepath, error in failures.items():
+            logging.error(f"Failed to write {filepath}: {error}")
+        return failures
+
+    def collect_one(self, model: str, sequence: str, data_type: str,
+                    output_dir: str, combination_index: int, precision: Optional[str] = None) -> Dict:
+        """采集并保存单个 模型×序列×数据类型×精度 组合，返回该组合的结果条目"""
+        precision = precision or self.precisions_for(model)[0]
+        label = f"{model} + {sequence} ({data_type}, {precision})"
+
+        reused = self.load_fresh_file(model, sequence, data_type, output_dir, combination_index, precision)
+        if reused:
+            self._increment_stat(self.refresh_stats, 'reused')
+            print(f"♻️  Reusing {label}: "
+                  f"{reused['record_count']} records, {reused['age_hours']:.1f}h old")
+            return reused
+
+        self._increment_stat(self.refresh_stats, 'fetched')
+        print(f"\n📊 Collecting {label}...")
+        metrics = new_request_metrics(None)
+        metrics.update({'model': model, 'sequence': sequence, 'data_type': data_type, 'precision': precision})
+        data, success = self.fetch_data(model, sequence, data_type, precision, metrics)
+
+        if not (success and data):
+            print(f"❌ Failed to fetch {label}")
+            return {
+                'success': False,
+                'precision': precision,
+                'error': 'Failed to fetch data',
+                'transfer': metrics
+            }
+
+        try:
+            # 分析数据
+            analysis = self.analyze_data(data)
+
+            # 保存文件
+            filepath = self.save_json_file(data, model, sequence, data_type,
+                                         output_dir, combination_index,
+                                         url=metrics['url'],
+                                         analysis=analysis, metrics=metrics, precision=precision)
+
+            print(f"✅ Success: {label}: "
+                  f"{analysis['record_count']} records, {analysis['b200_trt_count']} b200_trt")
+
+            return {
+                'success': True,
+                'record_count': analysis['record_count'],
+                'b200_trt_count': analysis['b200_trt_count'],
+                'hwkeys': sorted(list(analysis['hwkeys'])),
+                'filepath': filepath,
+                'content_hash': data.content_hash,
+                'precision': precision,
+                'coverage': analysis['coverage'],
+                'validation': data.verdict,
+                'transfer': metrics
+            }
+
+        except Exception as e:
+            print(f"❌ Failed to save file: {str(e)}")
+            return {
+                'success': False,
+                'precision': precision,
+                'error': str(e),
+                'transfer': metrics
+            }
+
+    def substitute_last_known_good(self, model: str, sequence: str, data_type: str, output_dir: str,
+                                   combination_index: int, precision: str, reason: str) -> Optional[Dict]:
+        """用最近一次通过校验的数据替代失败的组合，返回替代后的结果条目
+
+        优先沿用上次写出的原始数据文件（只改写元数据中的替代标记），没有时
+        从HTTP缓存中的响应体重新生成；都没有或超过 ``fallback.max_age_hours``
+        时返回None。替代文件同步写出，不经过写入线程池。
+        """
+        stem = self.raw_file_stem(model, sequence, data_type, combination_index,
+                                  self.variant_suffix(model, precision))
+        for raw_format in RAW_FORMATS:
+            filepath = raw_file_path(output_dir, stem, raw_format)
+            if not os.path.exists(filepath):
+                continue
+
+            try:
+                file_data = load_raw_file(filepath)
+            except Exception as e:
+                logging.warning(f"Cannot use {filepath} as last-known-good data: {e}")
+                break
+
+            metadata = file_data.get('metadata', {})
+            source_timestamp = metadata.get('substituted_from') or metadata.get('timestamp')
+            if not metadata.get('content_hash') or 'coverage' not in metadata:
+                break
+            if not self.fallback.is_usable(source_timestamp):
+                logging.warning(f"Last-known-good file {filepath} from {source_timestamp} is too old")
+                break
+
+            metadata = substitution_metadata(metadata, 'raw_file', source_timestamp, reason)
+            write_raw_file(filepath, metadata, file_data.get('data', []))
+            return {
+                'success': True,
+                'record_count': metadata.get('record_count', 0),
+                'b200_trt_count': metadata.get('b200_trt_count', 0),
+                'hwkeys': metadata.get('hwkeys', []),
+                'filepath': filepath,
+                'content_hash': metadata['content_hash'],
+                'precision': metadata.get('precision', precision),
+                'coverage': {
+                    'record_count': metadata.get('record_count', 0),
+                    'histograms': metadata['coverage']
+                },
+                'validation': metadata.get('validation'),
+                'substituted': True,
+                'substitution_source': metadata['substitution_source'],
+                'substituted_from': metadata['substituted_from'],
+                'substitution_reason': reason
+            }
+
+        if not self.http_cache:
+            return None
+        url = self.resolve_url(model, sequence, data_type, precision)
+        if url is None:
+            return None
+        cache_meta = self.http_cache.load_meta(url)
+        cached_chunks = self.http_cache.iter_body(url) if cache_meta else None
+        if cached_chunks is None or not self.fallback.is_usable(cache_meta.get('stored_at')):
+            return None
+
+        try:
+            data = self._decode_timed(cached_chunks, new_request_metrics(url), StreamValidator())
+            analysis = self.analyze_data(data)
+            filepath = self.save_json_file(data, model, sequence, data_type, output_dir, combination_index,
+                                           url=url, analysis=analysis, precision=precision,
+                                           substitution={'source': 'http_cache',
+                                                         'source_timestamp': cache_meta.get('stored_at'),
+                                                         'reason': reason})
+        except Exception as e:
+            logging.warning(f"Cannot use cached body of {url} as last-known-good data: {e}")
+            return None
+
+        return {
+            'success': True,
+            'record_count': analysis['record_count'],
+            'b200_trt_count': analysis['b200_trt_count'],
+            'hwkeys': sorted(list(analysis['hwkeys'])),
+            'filepath': filepath,
+            'content_hash': data.content_hash,
+            'precision': precision,
+            'coverage': analysis['coverage'],
+            'validation': data.verdict,
+            'substituted': True,
+            'substitution_source': 'http_cache',
+            'substituted_from': cache_meta.get('stored_at'),
+            'substitution_reason': reason
+        }
+
+    def retry_combinations(self, combinations: List[Dict], output_dir: str,
+                           attempts: int = 1, delay: float = 0) -> Dict:
+        """只重新采集指定的组合（后台重试），每轮之前等待 ``delay`` 秒
+
+        成功的组合覆盖原来的替代文件；返回 {'recovered': [...], 'remaining': [...],
+        'validated_files': {...}, 'content_hashes': {...}}，``validated_files`` 和
+        ``content_hashes``（只含恢复的组合）与 ``collect_all_data`` 的结果相同。
+        """
+        remaining = list(combinations)
+        recovered = []
+        validated_files = {}
+        content_hashes = {}
+        for attempt in range(1, attempts + 1):
+            if delay:
+                time.sleep(delay)
+            print(f"🔁 Retry {attempt}/{attempts}: {len(remaining)} combinations")
+
+            entries = [(combination, self.collect_one(combination['model'], combination['sequence'],
+                                                      combination['data_type'], output_dir,
+                                                      combination['combination_index'], combination['precision']))
+                       for combination in remaining]
+            write_failures = self.flush_writes()
+
+            remaining = []
+            for combination, entry in entries:
+                if entry['success'] and entry['filepath'] not in write_failures:
+                    recovered.append(combination)
+                    variant_key = self.variant_key(combination['data_type'], combination['model'],
+                                                   combination['precision'])
+                    content_hashes[f"{combination['model']}|{combination['sequence']}|{variant_key}"] = \
+                        entry['content_hash']
+                    if entry.get('validation'):
+                        validated_files[entry['filepath']] = {
+                            **{key: combination[key] for key in ('model', 'sequence', 'data_type', 'precision')},
+                            'validation': entry['validation']
+                        }
+                else:
+                    remaining.append(combination)
+            if not remaining:
+                break
+
+        return {'recovered': recovered, 'remaining': remaining, 'validated_files': validated_files,
+                'content_hashes': content_hashes}
+
     def collect_all_data(self, models: List[str], sequences: List[str],
                         output_dir: str) -> Dict:
-        """采集所有数据"""
+        """采集所有数据
+
+        最多 ``self.max_workers`` 个请求并发执行（来自配置
+        ``performance.max_concurrent_downloads``）；为1时退化为原有的
+        串行采集。请求速率由共享令牌桶（``performance.rate_limit``）控制，
+        文件写入与后续请求重叠执行，返回前等待全部写入完成（清理阶段之前的
+        屏障）。每个模型按 ``targets.precisions`` 采集全部精度变体，变体与其他
+        请求一起并发执行。无论并发与否，结果都按 模型→序列→数据类型→精度 的
+        顺序汇总。启用 ``fallback.last_known_good`` 时，采集或写入失败的组合在
+        写入屏障之后用最近一次通过校验的数据替代，所有失败的组合记入
+        ``retry_pending`` 供后台重试。
+        """
         data_types = ["e2e", "interactivity"]
         results = {
             'successful_collections': [],
@@ -151,19 +891,129 @@ class APIDataCollector:
             'total_files': 0,
             'total_records': 0,
             'total_b200_trt': 0,
-            'model_stats': {}
+            'model_stats': {},
+            'content_hashes': {}
         }
 
+        # 组合编号在每个模型内从1开始，与文件名前缀保持一致；
+        # 同一组合的各精度变体相邻排列，在线程池中并发采集
+        tasks = []
+        skipped_variants = []
+        missing_combinations = {}
+        for model in models:
+            for combination_index, sequence in enumerate(sequences, start=1):
+                for data_type in data_types:
+                    missing_since = self.missing_since(model, sequence, data_type)
+                    if missing_since:
+                        missing_combinations[EndpointManifest.make_key(model, sequence, data_type)] = missing_since
+                        continue
+                    for precision in self.precisions_for(model):
+                        if not self.variant_available(model, sequence, data_type, precision):
+                            skipped_variants.append(f"{model}|{sequence}|{data_type}|{precision}")
+                            continue
+                        tasks.append((model, sequence, data_type, precision, combination_index))
+
+        for variant in skipped_variants:
+            logging.info(f"Skipping {variant}: precision variant not in endpoint manifest")
+        for key, missing_since in missing_combinations.items():
+            logging.info(f"Skipping {key}: not found upstream (404/410) since {missing_since}")
+
+        if os.path.isdir(output_dir):
+            stale = remove_temp_files(output_dir)
+            if stale:
+                logging.warning(f"Removed {stale} temp files left by an interrupted run in {output_dir}")
+
+        entries = {}
+        if self.max_workers <= 1:
+            for model, sequence, data_type, precision, combination_index in tasks:
+                entries[(model, sequence, data_type, precision)] = self.collect_one(
+                    model, sequence, data_type, output_dir, combination_index, precision)
+        else:
+            print(f"⚡ Fetching {len(tasks)} URLs with up to {self.max_workers} concurrent downloads")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self.collect_one, model, sequence, data_type,
+                                    output_dir, combination_index, precision): (model, sequence, data_type, precision)
+                    for model, sequence, data_type, precision, combination_index in tasks
+                }
+                for future in as_completed(futures):
+                    entries[futures[future]] = future.result()
+
+        # 写入屏障：所有文件落盘后再汇总，写入失败的组合记为失败
+        write_failures = self.flush_writes()
+        for key, entry in entries.items():
+            if entry['success'] and entry['filepath'] in write_failures:
+                print(f"❌ Failed to save file: {write_failures[entry['filepath']]}")
+                entries[key] = {
+                    'success': False,
+                    'precision': entry['precision'],
+                    'error': str(write_failures[entry['filepath']]),
+                    'transfer': entry['transfer']
+                }
+
+        # 失败的组合：记录待重试，并尽量用最近一次通过校验的数据替代
+        retry_pending = []
+        substitutions = []
+        for model, sequence, data_type, precision, combination_index in tasks:
+            key = (model, sequence, data_type, precision)
+            entry = entries[key]
+            if entry['success']:
+                continue
+
+            retry_pending.append({'model': model, 'sequence': sequence, 'data_type': data_type,
+                                  'precision': precision, 'combination_index': combination_index})
+            if not self.fallback.enabled:
+                continue
+
+            substitute = self.substitute_last_known_good(model, sequence, data_type, output_dir,
+                                                         combination_index, precision, entry.get('error', ''))
+            if substitute is None:
+                print(f"❌ No last-known-good data for {model} + {sequence} ({data_type}, {precision})")
+                continue
+
+            print(f"🩹 Substituted {model} + {sequence} ({data_type}, {precision}) with "
+                  f"{substitute['substitution_source']} data from {substitute['substituted_from']}")
+            if 'transfer' in entry:
+                substitute['transfer'] = entry['transfer']
+            entries[key] = substitute
+            substitutions.append({
+                **retry_pending[-1],
+                'source': substitute['substitution_source'],
+                'substituted_from': substitute['substituted_from'],
+                'reason': substitute['substitution_reason']
+            })
+
+        # 每个请求的耗时分解单独汇总，不重复写入组合条目
+        transfers = [entries[task[:4]].pop('transfer') for task in tasks if 'transfer' in entries[task[:4]]]
+        results['transfer_metrics'] = {
+            'totals': summarize_transfers(transfers),
+            'requests': transfers
+        }
+        # 采集时对内存中数据得出的校验结论，交给清理阶段直接使用
+        results['validated_files'] = {}
+        for model, sequence, data_type, precision, _ in tasks:
+            entry = entries[(model, sequence, data_type, precision)]
+            verdict = entry.pop('validation', None)
+            if entry['success'] and verdict:
+                results['validated_files'][entry['filepath']] = {
+                    'model': model, 'sequence': sequence, 'data_type': data_type,
+                    'precision': precision, 'validation': verdict
+                }
+        results['skipped_variants'] = skipped_variants
+        results['missing_combinations'] = missing_combinations
+        results['substitutions'] = substitutions
+        results['retry_pending'] = retry_pending
+
         for model in models:
             model_stats = {
                 'files': 0,
                 'records': 0,
                 'b200_trt': 0,
                 'hwkeys': set(),
-                'successful_combinations': 0
+                'successful_combinations': 0,
+                'precisions': self.precisions_for(model)
             }
-
-            combination_index = 1
+            model_coverage = CoverageAccumulator()
 
             for sequence in sequences:
                 combination_data = {
@@ -176,55 +1026,28 @@ class APIDataCollector:
                 combination_success = False
 
                 for data_type in data_types:
-                    print(f"\n📊 Collecting {model} + {sequence} ({data_type})...")
-                    # 为Llama模型使用fp8精度，其他模型使用默认精度
-                    precision = 'fp8' if 'llama' in model.lower() else None
-                    data, success = self.fetch_data(model, sequence, data_type, precision)
-
-                    if success and data:
-                        try:
-                            # 保存文件
-                            filepath = self.save_json_file(data, model, sequence, data_type,
-                                                         output_dir, combination_index)
+                    for precision in self.precisions_for(model):
+                        entry = entries.get((model, sequence, data_type, precision))
+                        if entry is None:
+                            continue
 
-                            # 分析数据
-                            analysis = self.analyze_data(data)
+                        variant_key = self.variant_key(data_type, model, precision)
+                        combination_data['data_types'][variant_key] = entry
 
+                        if entry['success']:
                             # 更新统计
                             model_stats['files'] += 1
-                            model_stats['records'] += analysis['record_count']
-                            model_stats['b200_trt'] += analysis['b200_trt_count']
-                            model_stats['hwkeys'].update(analysis['hwkeys'])
+                            model_stats['records'] += entry['record_count']
+                            model_stats['b200_trt'] += entry['b200_trt_count']
+                            model_stats['hwkeys'].update(entry['hwkeys'])
+                            model_coverage.merge(CoverageAccumulator.from_dict(entry['coverage']))
 
                             results['total_files'] += 1
-                            results['total_records'] += analysis['record_count']
-                            results['total_b200_trt'] += analysis['b200_trt_count']
-
-                            combination_data['data_types'][data_type] = {
-                                'success': True,
-                                'record_count': analysis['record_count'],
-                                'b200_trt_count': analysis['b200_trt_count'],
-                                'hwkeys': sorted(list(analysis['hwkeys'])),
-                                'filepath': filepath
-                            }
+                            results['total_records'] += entry['record_count']
+                            results['total_b200_trt'] += entry['b200_trt_count']
+                            results['content_hashes'][f"{model}|{sequence}|{variant_key}"] = entry['content_hash']
 
                             combination_success = True
-                            print(f"✅ Success: {analysis['record_count']} records, {analysis['b200_trt_count']} b200_trt")
-
-                        except Exception as e:
-                            print(f"❌ Failed to save file: {str(e)}")
-                            combination_data['data_types'][data_type] = {
-                                'success': False,
-                                'error': str(e)
-                            }
-                    else:
-                        print(f"❌ Failed to fetch data")
-                        combination_data['data_types'][data_type] = {
-                            'success': False,
-                            'error': 'Failed to fetch data'
-                        }
-
-                    time.sleep(0.5)  # 避免请求过快
 
                 if combination_success:
                     model_stats['successful_combinations'] += 1
@@ -232,17 +1055,41 @@ class APIDataCollector:
                 else:
                     results['failed_collections'].append(combination_data)
 
-                combination_index += 1
-
             # 转换hwkeys为列表以便JSON序列化
             model_stats['hwkeys'] = sorted(list(model_stats['hwkeys']))
+            model_stats['coverage'] = model_coverage.to_dict()['histograms']
             results['model_stats'][model] = model_stats
 
+        results['coverage'] = CoverageAccumulator.merged(
+            {'record_count': stats['records'], 'histograms': stats['coverage']}
+            for stats in results['model_stats'].values()
+        ).to_dict()['histograms']
+
+        results['http_cache'] = {
+            'enabled': self.http_cache is not None,
+            'hits': self.cache_stats['hits'],
+            'misses': self.cache_stats['misses']
+        }
+        results['request_stats'] = dict(self.request_stats)
+        results['refresh'] = dict(self.refresh_stats)
+        results['rate_limit'] = {'enabled': False}
+        if self.rate_limiter:
+            results['rate_limit'] = {'enabled': True, **self.rate_limiter.summary()}
+        results['hedging'] = {'enabled': False}
+        if self.hedger:
+            results['hedging'] = {'enabled': True, **self.hedger.summary()}
+        results['connection_pool'] = {
+            'shared': not self.owns_http_client,
+            **self.http_client.run_stats(self._pool_baseline)
+        }
+
         return results
 
 
 def scrape_api_data(models: List[str], sequences: List[str],
-                    output_dir: str = "json_data/raw_json_files") -> Dict:
+                    output_dir: str = "json_data/raw_json_files",
+                    config: Optional[Dict] = None,
+                    http_client: Optional[PooledHTTPClient] = None) -> Dict:
     """
     使用API方法采集数据的入口函数
 
@@ -250,6 +1097,8 @@ def scrape_api_data(models: List[str], sequences: List[str],
         models: 模型列表
         sequences: 序列长度列表
         output_dir: 输出目录
+        config: 管道配置（读取 performance 等配置段），为空时使用默认值
+        http_client: 共享的HTTP客户端（调度器守护进程持有），为空时为本次运行创建
 
     Returns:
         采集结果字典
@@ -262,17 +1111,25 @@ def scrape_api_data(models: List[str], sequences: List[str],
     os.makedirs(output_dir, exist_ok=True)
 
     # 创建采集器
-    collector = APIDataCollector()
+    collector = APIDataCollector(config, http_client=http_client)
 
     # 开始采集
     start_time = time.time()
-    results = collector.collect_all_data(models, sequences, output_dir)
+    try:
+        collector.ensure_manifest(models, sequences)
+        results = collector.collect_all_data(models, sequences, output_dir)
+    finally:
+        collector.close()
     elapsed_time = time.time() - start_time
 
     # 更新统计
     results['elapsed_time'] = elapsed_time
     results['timestamp'] = datetime.now().isoformat()
 
+    textfile = (config or {}).get('monitoring', {}).get('prometheus_textfile')
+    if textfile:
+        write_prometheus_textfile(textfile, results['transfer_metrics']['requests'])
+
     # 打印结果
     print(f"\n{'='*80}")
     print(f"📈 Collection Statistics:")
@@ -282,6 +1139,39 @@ def scrape_api_data(models: List[str], sequences: List[str],
     print(f"Total records: {results['total_records']}")
     print(f"Total b200_trt data: {results['total_b200_trt']}")
     print(f"Successful combinations: {len(results['successful_collections'])}")
+    if results['substitutions']:
+        print(f"Substituted with last-known-good data: {len(results['substitutions'])} "
+              f"(of {len(results['retry_pending'])} failed fetches)")
+    if results['http_cache']['enabled']:
+        print(f"HTTP cache: {results['http_cache']['hits']} hits, {results['http_cache']['misses']} misses")
+    if results['refresh']['reused']:
+        print(f"Refresh: {results['refresh']['fetched']} fetched, "
+              f"{results['refresh']['reused']} reused within TTL")
+    if results['request_stats']['retries'] or results['request_stats']['circuit_rejections']:
+        print(f"Retries: {results['request_stats']['retries']}, "
+              f"circuit breaker rejections: {results['request_stats']['circuit_rejections']}")
+    if results['request_stats']['validation_failures']:
+        print(f"Invalid payloads: {results['request_stats']['validation_failures']}, "
+              f"re-fetched: {results['request_stats']['refetches']}")
+    totals = results['transfer_metrics']['totals']
+    if totals['requests']:
+        print(f"Time breakdown (summed over {totals['requests']} requests): "
+              f"connect {totals['connect_seconds']:.2f}s, TTFB {totals['ttfb_seconds']:.2f}s, "
+              f"transfer {totals['transfer_seconds']:.2f}s, decode {totals['decode_seconds']:.2f}s, "
+              f"write {totals['write_seconds']:.2f}s, {totals['bytes']:,} bytes")
+    if results['rate_limit']['enabled']:
+        rate_limit = results['rate_limit']
+        print(f"Rate limit: {rate_limit['requests_per_second']} req/s (burst {rate_limit['burst']}), "
+              f"{rate_limit['throttled_requests']} requests waited {rate_limit['throttled_seconds']:.1f}s")
+    if results['hedging']['enabled']:
+        hedging = results['hedging']
+        print(f"Hedging: {hedging['hedged']}/{hedging['requests']} requests hedged "
+              f"({hedging['hedge_rate']:.1%}), {hedging['hedge_wins']} won by the hedge")
+    pool = results['connection_pool']
+    if pool['requests']:
+        print(f"Connection pool: {pool['reused_connections']}/{pool['requests']} requests on reused connections "
+              f"({pool['reuse_rate']:.1%}), {pool['new_connections']} new, pool size {pool['pool_size']}"
+              f"{' (shared)' if pool['shared'] else ''}")
 
     print(f"\n📊 Model Details:")
     for model, stats in results['model_stats'].items():
@@ -290,6 +1180,8 @@ def scrape_api_data(models: List[str], sequences: List[str],
         print(f"  Records: {stats['records']}")
         print(f"  b200_trt: {stats['b200_trt']} ({'✅' if stats['b200_trt'] > 0 else '❌'})")
         print(f"  Hardware: {stats['hwkeys']}")
+        print(f"  Variants: {stats['precisions']}")
+        print(f"  Precision: {stats['coverage']['precision']}")
 
     # 保存总结报告
     summary_file = os.path.join(output_dir, 'api_scraping_summary.json')
@@ -302,17 +1194,36 @@ def scrape_api_data(models: List[str], sequences: List[str],
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='InferenceMAX API 数据采集器')
+    parser.add_argument('--config', '-c', help='管道配置文件路径（YAML）')
+    parser.add_argument('--discover', action='store_true',
+                        help='只探测数据端点并更新端点清单')
+    args = parser.parse_args()
+
     # 设置日志
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+    config = {}
+    if args.config:
+        import yaml
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+
     # 定义要采集的数据
-    models = [
+    targets = config.get('targets', {})
+    models = targets.get('models', [
         "Llama 3.3 70B Instruct",
         "gpt-oss 120B",
         "DeepSeek R1 0528"
-    ]
+    ])
 
-    sequences = ["1K / 1K", "1K / 8K", "8K / 1K"]
+    sequences = targets.get('sequences', ["1K / 1K", "1K / 8K", "8K / 1K"])
 
-    # 执行采集
-    results = scrape_api_data(models, sequences)
\ No newline at end of file
+    if args.discover:
+        config.setdefault('discovery', {})['enabled'] = True
+        APIDataCollector(config).discover_endpoints(models, sequences)
+    else:
+        # 执行采集
+        results = scrape_api_data(models, sequences, config=config or None)
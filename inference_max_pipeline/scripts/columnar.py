@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+InferenceMAX 数据的流式JSON解码与列式缓冲
+
+API返回的是一个JSON数组，每个元素是一个数据点::
+
+    {"x": 7.213, "y": 980.389, "conc": 16, "tp": 4, "hwKey": "mi300x",
+     "precision": "fp4", "tpPerGpu": {"y": 980.389, "roof": true}, ...}
+
+StreamingArrayDecoder 按块增量解析数组元素，ColumnarPayload 把每个元素拆进
+定长类型的列缓冲中，不再保留完整的字典列表和原始文本。
+"""
+
+import sys
+import json
+import codecs
+import hashlib
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from coverage_stats import CoverageAccumulator
+
+# 已知字段及其类型，列名与CSV转换时的扁平化字段名一致
+NUMBER_COLUMNS = ('x', 'y', 'conc', 'tp')
+STRING_COLUMNS = ('hwKey', 'precision')
+NESTED_METRICS = ('tpPerGpu', 'tpPerMw', 'costh', 'costn', 'costr')
+
+# 数值列中每行的类型标记
+_MISSING, _FLOAT, _INT = 0, 1, 2
+# 布尔列中每行的取值标记
+_BOOL_MISSING, _BOOL_FALSE, _BOOL_TRUE = 0, 1, 2
+
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _NumberColumn:
+    """float64 数值列，另存一个字节的类型标记以无损还原 int/float/缺失"""
+
+    def __init__(self):
+        self.values = array('d')
+        self.kinds = bytearray()
+
+    def append(self, value) -> bool:
+        """追加一个值，类型不符时返回False由调用方放入额外字段"""
+        if value is None:
+            self.values.append(0.0)
+            self.kinds.append(_MISSING)
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        else:
+            self.values.append(float(value))
+            self.kinds.append(_INT if isinstance(value, int) else _FLOAT)
+        return True
+
+    def get(self, row: int):
+        kind = self.kinds[row]
+        if kind == _MISSING:
+            return None
+        value = self.values[row]
+        return int(value) if kind == _INT else value
+
+    def nbytes(self) -> int:
+        return self.values.itemsize * len(self.values) + len(self.kinds)
+
+
+class _BoolColumn:
+    """布尔列，每行一个字节"""
+
+    def __init__(self):
+        self.flags = bytearray()
+
+    def append(self, value) -> bool:
+        if value is None:
+            self.flags.append(_BOOL_MISSING)
+        elif isinstance(value, bool):
+            self.flags.append(_BOOL_TRUE if value else _BOOL_FALSE)
+        else:
+            return False
+        return True
+
+    def get(self, row: int):
+        flag = self.flags[row]
+        return None if flag == _BOOL_MISSING else flag == _BOOL_TRUE
+
+    def nbytes(self) -> int:
+        return len(self.flags)
+
+
+class _StringColumn:
+    """字符串列，取值驻留（hwKey/precision 只有少量不同取值）"""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+
+    def append(self, value) -> bool:
+        if value is None:
+            self.values.append(None)
+        elif isinstance(value, str):
+            self.values.append(sys.intern(value))
+        else:
+            return False
+        return True
+
+    def get(self, row: int):
+        return self.values[row]
+
+    def nbytes(self) -> int:
+        return 8 * len(self.values)
+
+
+def _fits_nested_metric(nested) -> bool:
+    """嵌套指标是否为可放入列缓冲的 {"y": 数值, "roof": 布尔} 形式"""
+    if not isinstance(nested, dict) or not nested or not set(nested) <= {'y', 'roof'}:
+        return False
+    y = nested.get('y')
+    roof = nested.get('roof')
+    if 'y' in nested and (isinstance(y, bool) or not isinstance(y, (int, float))):
+        return False
+    if 'roof' in nested and not isinstance(roof, bool):
+        return False
+    return True
+
+
+class ColumnarPayload:
+    """一个API响应的列式表示
+
+    已知字段进入类型化列；未知字段、类型不符的值和非字典元素按行号稀疏保存，
+    因此 ``iter_records()`` 能还原出与原始响应等价的数据点。
+    """
+
+    def __init__(self):
+        self.row_count = 0
+        self.raw_size = 0
+        self.content_hash: Optional[str] = None
+        self.coverage = CoverageAccumulator()
+        # 解码时的结构校验结论（见 payload_validation.StreamValidator.verdict）
+        self.verdict: Optional[Dict] = None
+
+        self.columns: Dict[str, object] = {}
+        for name in NUMBER_COLUMNS:
+            self.columns[name] = _NumberColumn()
+        for name in STRING_COLUMNS:
+            self.columns[name] = _StringColumn()
+        for metric in NESTED_METRICS:
+            self.columns[f"{metric}_y"] = _NumberColumn()
+            self.columns[f"{metric}_roof"] = _BoolColumn()
+
+        self._extras: Dict[int, Dict] = {}
+        self._non_dict_rows: Dict[int, object] = {}
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __iter__(self) -> Iterator:
+        return self.iter_records()
+
+    def _append_missing(self):
+        for column in self.columns.values():
+            column.append(None)
+
+    def append(self, item):
+        """追加一个数据点"""
+        row = self.row_count
+        self.row_count += 1
+
+        if not isinstance(item, dict):
+            self._append_missing()
+            self._non_dict_rows[row] = item
+            return
+
+        extras = {}
+        for name in NUMBER_COLUMNS + STRING_COLUMNS:
+            column = self.columns[name]
+            if name not in item:
+                column.append(None)
+            elif item[name] is None or not column.append(item[name]):
+                column.append(None)
+                extras[name] = item[name]
+
+        for metric in NESTED_METRICS:
+            y_column = self.columns[f"{metric}_y"]
+            roof_column = self.columns[f"{metric}_roof"]
+            nested = item.get(metric)
+            if metric in item and _fits_nested_metric(nested):
+                y_column.append(nested.get('y'))
+                roof_column.append(nested.get('roof'))
+            else:
+                y_column.append(None)
+                roof_column.append(None)
+                if metric in item:
+                    extras[metric] = nested
+
+        for key, value in item.items():
+            if key not in self.columns and key not in NESTED_METRICS:
+                extras[key] = value
+
+        if extras:
+            self._extras[row] = extras
+
+    def column(self, name: str) -> List:
+        """取出一列的值（缺失为None）"""
+        column = self.columns[name]
+        return [column.get(row) for row in range(self.row_count)]
+
+    def record(self, row: int):
+        """还原第 row 行的数据点"""
+        if row in self._non_dict_rows:
+            return self._non_dict_rows[row]
+
+        extras = self._extras.get(row, {})
+        record = {}
+        for name in NUMBER_COLUMNS + STRING_COLUMNS:
+            value = self.columns[name].get(row)
+            if value is not None:
+                record[name] = value
+            elif name in extras:
+                record[name] = extras[name]
+
+        for metric in NESTED_METRICS:
+            y = self.columns[f"{metric}_y"].get(row)
+            roof = self.columns[f"{metric}_roof"].get(row)
+            if y is not None or roof is not None:
+                nested = {}
+                if y is not None:
+                    nested['y'] = y
+                if roof is not None:
+                    nested['roof'] = roof
+                record[metric] = nested
+            elif metric in extras:
+                record[metric] = extras[metric]
+
+        for key, value in extras.items():
+            if key not in record:
+                record[key] = value
+        return record
+
+    def iter_records(self) -> Iterator:
+        """逐行还原数据点，不一次性构建完整列表"""
+        for row in range(self.row_count):
+            yield self.record(row)
+
+    def to_records(self) -> List:
+        return list(self.iter_records())
+
+    def nbytes(self) -> int:
+        """列缓冲占用的大致字节数"""
+        return sum(column.nbytes() for column in self.columns.values())
+
+
+class StreamingArrayDecoder:
+    """增量解析顶层JSON数组，每解析出一个元素就回调 ``on_item``"""
+
+    _WHITESPACE = ' \t\n\r'
+
+    def __init__(self, on_item: Callable):
+        self.on_item = on_item
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._state = 'start'  # start -> value/first -> separator -> done
+
+    def feed(self, chunk: bytes):
+        self._buffer += self._text_decoder.decode(chunk)
+        self._drain()
+
+    def _drain(self):
+        buffer = self._buffer
+        pos = 0
+        length = len(buffer)
+
+        while True:
+            while pos < length and buffer[pos] in self._WHITESPACE:
+                pos += 1
+            if pos >= length:
+                break
+
+            char = buffer[pos]
+            if self._state == 'start':
+                if char != '[':
+                    raise ValueError("Expected a top-level JSON array")
+                self._state = 'first'
+                pos += 1
+            elif self._state in ('first', 'value'):
+                if char == ']' and self._state == 'first':
+                    self._state = 'done'
+                    pos += 1
+                    continue
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # 元素不完整，等待更多数据
+                if end == length and char not in '{["':
+                    break  # 数字/字面量可能被截断在块边界
+                self.on_item(item)
+                self._state = 'separator'
+                pos = end
+            elif self._state == 'separator':
+                if char == ',':
+                    self._state = 'value'
+                elif char == ']':
+                    self._state = 'done'
+                else:
+                    raise ValueError(f"Unexpected character {char!r} in JSON array")
+                pos += 1
+            else:
+                raise ValueError("Unexpected data after end of JSON array")
+
+        self._buffer = buffer[pos:]
+
+    def close(self):
+        """结束解析，数组不完整时抛出 ValueError"""
+        self._buffer += self._text_decoder.decode(b'', final=True)
+        self._drain()
+        if self._state != 'done' or self._buffer.strip():
+            raise ValueError("Truncated or malformed JSON array")
+
+
+def decode_json_stream(chunks: Iterable[bytes], validate: Optional[Callable] = None) -> ColumnarPayload:
+    """把字节块流解码为 ColumnarPayload，同时计算原始大小、内容哈希和覆盖度统计
+
+    ``validate`` 对每个解析出的元素调用一次，抛出异常即中止解码。
+    """
+    payload = ColumnarPayload()
+
+    def on_item(item):
+        if validate:
+            validate(item)
+        payload.append(item)
+        payload.coverage.add(item)
+
+    decoder = StreamingArrayDecoder(on_item)
+    hasher = hashlib.sha256()
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        hasher.update(chunk)
+        payload.raw_size += len(chunk)
+        decoder.feed(chunk)
+
+    decoder.close()
+    payload.content_hash = hasher.hexdigest()
+    return payload
+
+
+def iter_file_chunks(path: str, chunk_size: int = _STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """按块读取文件"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+数据覆盖度统计 - 单遍累计 hwKey / precision / tp / conc 直方图
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, Set
+
+
+class CoverageAccumulator:
+    """按维度统计数据点数量的累加器
+
+    解码时每个数据点调用一次 ``add``，一遍扫描即可得到全部维度的直方图；
+    多个累加器可以用 ``merge`` 汇总成模型级或整次运行级的统计。
+    """
+
+    DIMENSIONS = ('hwKey', 'precision', 'tp', 'conc')
+    NUMERIC_DIMENSIONS = ('tp', 'conc')
+
+    def __init__(self):
+        self.record_count = 0
+        self.histograms: Dict[str, Counter] = {dimension: Counter() for dimension in self.DIMENSIONS}
+
+    def add(self, item):
+        """累计一个数据点；缺失的维度记为空字符串"""
+        self.record_count += 1
+        if not isinstance(item, dict):
+            return
+        for dimension in self.DIMENSIONS:
+            value = item.get(dimension)
+            self.histograms[dimension][str(value) if value is not None else ''] += 1
+
+    def merge(self, other: 'CoverageAccumulator'):
+        self.record_count += other.record_count
+        for dimension in self.DIMENSIONS:
+            self.histograms[dimension].update(other.histograms[dimension])
+
+    @classmethod
+    def from_dict(cls, coverage: Dict) -> 'CoverageAccumulator':
+        accumulator = cls()
+        accumulator.record_count = coverage.get('record_count', 0)
+        for dimension in cls.DIMENSIONS:
+            accumulator.histograms[dimension].update(coverage.get('histograms', {}).get(dimension, {}))
+        return accumulator
+
+    @classmethod
+    def merged(cls, coverages: Iterable[Dict]) -> 'CoverageAccumulator':
+        """汇总多个 ``to_dict()`` 结果"""
+        total = cls()
+        for coverage in coverages:
+            total.merge(cls.from_dict(coverage))
+        return total
+
+    @property
+    def hwkeys(self) -> Set[str]:
+        return set(self.histograms['hwKey'])
+
+    def count_matching(self, dimension: str, needle: str) -> int:
+        """某维度取值包含 needle（不区分大小写）的数据点数量"""
+        needle = needle.lower()
+        return sum(count for value, count in self.histograms[dimension].items() if needle in value.lower())
+
+    def _sorted_histogram(self, dimension: str) -> Dict[str, int]:
+        histogram = self.histograms[dimension]
+        if dimension in self.NUMERIC_DIMENSIONS:
+            def sort_key(value):
+                try:
+                    return (0, float(value), value)
+                except ValueError:
+                    return (1, 0.0, value)
+        else:
+            def sort_key(value):
+                return value
+        return {value: histogram[value] for value in sorted(histogram, key=sort_key)}
+
+    def to_dict(self) -> Dict:
+        """可JSON序列化的统计结果"""
+        return {
+            'record_count': self.record_count,
+            'histograms': {dimension: self._sorted_histogram(dimension) for dimension in self.DIMENSIONS}
+        }
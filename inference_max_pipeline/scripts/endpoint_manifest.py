@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+数据端点清单 - 持久化探测成功的 InferenceMAX 数据URL
+"""
+
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+
+class EndpointManifest:
+    """模型×序列×数据类型 → 各精度变体URL 的清单
+
+    清单文件格式::
+
+        {
+          "generated_at": "...",
+          "base_url": "https://.../data/inference-performance",
+          "endpoints": {
+            "Llama 3.3 70B Instruct|1K / 1K|e2e": {"fp8": "https://..."},
+            "gpt-oss 120B|1K / 1K|e2e": {"default": "https://..."}
+          },
+          "missing": {
+            "DeepSeek R1|8K / 1K|e2e": {"missing_since": "...", "checked_at": "..."}
+          }
+        }
+
+    ``default`` 表示URL中不带精度中缀的变体。``missing`` 记录所有候选URL都返回
+    404/410 的组合（否定条目），在 ``max_age_hours`` 内视为已知，不再重新探测和采集。
+    """
+
+    DEFAULT_PRECISION = 'default'
+
+    def __init__(self, manifest_file: str, base_url: str):
+        self.manifest_file = manifest_file
+        self.base_url = base_url
+        self.generated_at: Optional[datetime] = None
+        self.manifest_base_url: Optional[str] = None
+        self.endpoints: Dict[str, Dict[str, str]] = {}
+        self.missing: Dict[str, Dict[str, str]] = {}
+        self.load()
+
+    @staticmethod
+    def make_key(model: str, sequence: str, data_type: str) -> str:
+        """清单中的组合键"""
+        return f"{model}|{sequence}|{data_type}"
+
+    def load(self):
+        """从磁盘读取清单，不存在或损坏时保持为空"""
+        if not os.path.exists(self.manifest_file):
+            return
+
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.endpoints = manifest.get('endpoints', {})
+            self.missing = manifest.get('missing', {})
+            self.manifest_base_url = manifest.get('base_url')
+            self.generated_at = datetime.fromisoformat(manifest['generated_at'])
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable endpoint manifest {self.manifest_file}: {e}")
+            self.endpoints = {}
+            self.missing = {}
+            self.generated_at = None
+
+    def save(self):
+        """写入清单"""
+        directory = os.path.dirname(self.manifest_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.generated_at = datetime.now()
+        self.manifest_base_url = self.base_url
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generated_at': self.generated_at.isoformat(),
+                'base_url': self.base_url,
+                'endpoints': self.endpoints,
+                'missing': self.missing
+            }, f, indent=2, ensure_ascii=False)
+
+    def needs_discovery(self, keys: List[str], max_age_hours: float) -> bool:
+        """清单缺失、过期、数据源地址变化或有目标组合既无URL也无有效的否定条目时需要重新探测"""
+        if self.generated_at is None or self.manifest_base_url != self.base_url:
+            return True
+        if max_age_hours and datetime.now() - self.generated_at > timedelta(hours=max_age_hours):
+            return True
+        return any(key not in self.endpoints and not self._missing_is_fresh(key, max_age_hours)
+                   for key in keys)
+
+    def _missing_is_fresh(self, key: str, max_age_hours: float) -> bool:
+        entry = self.missing.get(key)
+        if not entry:
+            return False
+        if not max_age_hours:
+            return True
+        try:
+            checked_at = datetime.fromisoformat(entry['checked_at'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return datetime.now() - checked_at <= timedelta(hours=max_age_hours)
+
+    def set_variants(self, model: str, sequence: str, data_type: str, variants: Dict[str, str]):
+        """记录一个组合探测到的全部精度变体；传入空字典时移除该组合（探测结果无法判断）"""
+        key = self.make_key(model, sequence, data_type)
+        self.missing.pop(key, None)
+        if variants:
+            self.endpoints[key] = variants
+        else:
+            self.endpoints.pop(key, None)
+
+    def set_missing(self, model: str, sequence: str, data_type: str):
+        """记录一个所有候选URL都返回 404/410 的组合，``missing_since`` 保留第一次确认的时间"""
+        key = self.make_key(model, sequence, data_type)
+        now = datetime.now().isoformat()
+        self.endpoints.pop(key, None)
+        self.missing[key] = {'missing_since': self.missing.get(key, {}).get('missing_since', now),
+                             'checked_at': now}
+
+    def missing_since(self, model: str, sequence: str, data_type: str,
+                      max_age_hours: float) -> Optional[str]:
+        """组合在有效期内的否定条目的首次确认时间，没有否定条目或已过期时为None"""
+        key = self.make_key(model, sequence, data_type)
+        if not self._missing_is_fresh(key, max_age_hours):
+            return None
+        return self.missing[key].get('missing_since')
+
+    def get_variants(self, model: str, sequence: str, data_type: str) -> Dict[str, str]:
+        """组合已探测到的全部精度变体 {精度: URL}，未探测过时为空"""
+        return dict(self.endpoints.get(self.make_key(model, sequence, data_type)) or {})
+
+    def get_url(self, model: str, sequence: str, data_type: str,
+                precision: Optional[str] = None, strict: bool = False,
+                exclude: Iterable[str] = ()) -> Optional[str]:
+        """查找URL：优先匹配指定精度，其次不带精度的变体，最后任一变体
+
+        ``strict`` 为真时只返回指定精度的URL；回退时跳过 ``exclude`` 中的精度
+        （这些变体会单独采集，回退到它们会把同一份数据保存两次）。
+        """
+        variants = self.endpoints.get(self.make_key(model, sequence, data_type))
+        if not variants:
+            return None
+
+        if precision and precision in variants:
+            return variants[precision]
+        if strict:
+            return None
+        fallbacks = {name: url for name, url in variants.items() if name not in set(exclude)}
+        if self.DEFAULT_PRECISION in fallbacks:
+            return fallbacks[self.DEFAULT_PRECISION]
+        return next(iter(fallbacks.values()), None)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+对冲请求 - 请求超过近期延迟分位数仍未返回时，发出一个重复请求取先返回者
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+
+class LatencyTracker:
+    """最近若干次请求延迟的滑动窗口"""
+
+    def __init__(self, window: int = 100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """最近延迟的第 p 百分位（最近邻法），没有样本时返回None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(p / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+
+
+class RequestHedger:
+    """对冲执行请求
+
+    主请求在 ``percentile`` 分位延迟内未返回时再发出一个备份请求，使用先
+    成功返回的结果，另一个结果到达后交给 ``discard`` 释放。样本不足
+    ``min_samples`` 或对冲比例已达 ``max_hedge_ratio`` 时不对冲。
+
+    延迟样本和对冲等待只计 ``send()`` 本身，不含 ``throttle()`` 的限速等待，
+    否则限速时分位数会升到令牌桶的等待时间，对冲不再触发。对冲覆盖的是
+    ``send()`` 返回前的时间：采集器以 ``stream=True`` 发送请求，``send()`` 在
+    收到响应头时返回，响应体的传输不在对冲范围内。
+    """
+
+    def __init__(self, max_workers: int, percentile: float = 95, min_samples: int = 5,
+                 max_hedge_ratio: float = 0.2, window: int = 100):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.latencies = LatencyTracker(window)
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0}
+        self._stats_lock = threading.Lock()
+        # 每个采集线程最多同时占用两个对冲线程
+        self._executor = ThreadPoolExecutor(max_workers=2 * max_workers, thread_name_prefix='hedge')
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """发出备份请求前的等待时间，返回None表示本次不对冲"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        with self._stats_lock:
+            if self.stats['requests'] and self.stats['hedged'] >= self.max_hedge_ratio * self.stats['requests']:
+                return None
+        return self.latencies.percentile(self.percentile)
+
+    def _timed(self, send: Callable, throttle: Optional[Callable], sent: threading.Event):
+        def run():
+            try:
+                if throttle:
+                    throttle()
+            finally:
+                sent.set()
+            start = time.monotonic()
+            result = send()
+            self.latencies.record(time.monotonic() - start)
+            return result
+        return run
+
+    def run(self, send: Callable, discard: Callable, throttle: Optional[Callable] = None):
+        """执行 ``send()``，必要时对冲；返回先成功的结果，两个都失败时抛出主请求的异常
+
+        ``throttle`` 在每次 ``send()`` 之前调用（限速等待），不计入延迟。
+        """
+        self._count('requests')
+        delay = self.hedge_delay()
+        primary_sent = threading.Event()
+        primary = self._executor.submit(self._timed(send, throttle, primary_sent))
+
+        if delay is None:
+            return primary.result()
+
+        # 对冲等待从主请求真正发出时开始计时
+        primary_sent.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count('hedged')
+        backup = self._executor.submit(self._timed(send, throttle, threading.Event()))
+        pending = {primary, backup}
+        first_error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    if future is primary or first_error is None:
+                        first_error = future.exception()
+                    continue
+
+                if future is backup:
+                    self._count('hedge_wins')
+                # 较慢的请求返回后立即释放
+                for other in pending:
+                    other.add_done_callback(
+                        lambda f: discard(f.result()) if f.exception() is None else None)
+                for other in done - {future}:
+                    if other.exception() is None:
+                        discard(other.result())
+                return future.result()
+
+        raise first_error
+
+    def summary(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['hedge_rate'] = round(stats['hedged'] / stats['requests'], 4) if stats['requests'] else 0.0
+        stats['latency_p50'] = self.latencies.percentile(50)
+        stats[f"latency_p{self.percentile:g}"] = self.latencies.percentile(self.percentile)
+        return stats
+
+    def shutdown(self):
+        """采集结束时释放对冲线程池（仍在进行的较慢请求完成后由 ``discard`` 释放）"""
+        self._executor.shutdown(wait=False)
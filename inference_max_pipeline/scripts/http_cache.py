@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+HTTP 条件请求缓存 - 按URL持久化 ETag / Last-Modified 校验值和响应体
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from columnar import iter_file_chunks
+
+
+class HTTPValidatorCache:
+    """基于磁盘的HTTP校验值缓存
+
+    每个URL对应两个文件：``<key>.meta.json`` 保存 ETag、Last-Modified 等
+    校验信息，``<key>.body`` 保存上次 200 响应的原始字节。响应体先写入临时
+    文件，完整接收后再替换，因此读取方不会看到写了一半的缓存。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, url: str) -> str:
+        """URL对应的缓存文件名前缀"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._key(url)}.meta.json")
+
+    def _body_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._key(url)}.body")
+
+    def load_meta(self, url: str) -> Optional[Dict]:
+        """读取URL的校验信息，缓存不存在或损坏时返回None"""
+        meta_path = self._meta_path(url)
+        if not os.path.exists(meta_path) or not os.path.exists(self._body_path(url)):
+            return None
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.warning(f"Ignoring corrupt HTTP cache entry for {url}: {e}")
+            return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """生成 If-None-Match / If-Modified-Since 请求头"""
+        meta = self.load_meta(url)
+        if not meta:
+            return {}
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def iter_body(self, url: str, chunk_size: int = 64 * 1024) -> Optional[Iterator[bytes]]:
+        """按块读取缓存的响应体，缓存体不存在时返回None"""
+        body_path = self._body_path(url)
+        if not os.path.exists(body_path):
+            return None
+
+        return iter_file_chunks(body_path, chunk_size)
+
+    def open_writer(self, url: str, etag: Optional[str],
+                    last_modified: Optional[str]) -> Optional['CacheBodyWriter']:
+        """为流式下载的响应体创建缓存写入器；没有任何校验值时返回None"""
+        if not etag and not last_modified:
+            return None
+        return CacheBodyWriter(self, url, etag, last_modified)
+
+    def _write_meta(self, url: str, etag: Optional[str], last_modified: Optional[str], size: int):
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': size,
+            'stored_at': datetime.now().isoformat()
+        }
+        with open(self._meta_path(url), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    def _discard_meta(self, url: str):
+        meta_path = self._meta_path(url)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+
+class CacheBodyWriter:
+    """边下载边写入缓存的响应体，完整接收并解码成功后才提交"""
+
+    def __init__(self, cache: HTTPValidatorCache, url: str,
+                 etag: Optional[str], last_modified: Optional[str]):
+        self.cache = cache
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = 0
+        self._tmp_path = f"{cache._body_path(url)}.tmp.{os.getpid()}.{threading.get_ident()}"
+        self._file = open(self._tmp_path, 'wb')
+
+    def tee(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """透传字节块，同时写入临时文件"""
+        for chunk in chunks:
+            self._file.write(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+    def commit(self):
+        """响应体完整有效，替换旧缓存"""
+        self._file.close()
+        self.cache._discard_meta(self.url)
+        os.replace(self._tmp_path, self.cache._body_path(self.url))
+        self.cache._write_meta(self.url, self.etag, self.last_modified, self.size)
+
+    def abort(self):
+        """丢弃未完成的响应体，保留旧缓存"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+共享HTTP客户端 - 带连接池的长期会话，可在多次管道运行之间复用
+"""
+
+import threading
+from typing import Dict, Optional
+
+import requests
+
+from transfer_metrics import TimedHTTPAdapter
+
+USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/91.0.4472.124 Safari/537.36')
+
+
+# 关闭前最多读取的剩余响应体字节数；读完的连接归还连接池，否则连接被丢弃
+MAX_DRAIN_BYTES = 64 * 1024
+
+
+def release_response(response: requests.Response):
+    """关闭流式响应，并尽量把连接归还连接池
+
+    未读完响应体就关闭会断开底层连接。304、404 等响应体很小（或为空），
+    先读完再关闭；Content-Length 未知或较大（如只读响应头的探测请求）时直接关闭。
+    """
+    try:
+        length = int(response.headers.get('Content-Length', -1))
+    except ValueError:
+        length = -1
+    if response.status_code == 304 or 0 <= length <= MAX_DRAIN_BYTES:
+        try:
+            response.content
+        except requests.RequestException:
+            pass
+    response.close()
+
+
+def default_pool_size(config: Dict) -> int:
+    """连接池大小：performance.connection_pool_size，未配置时与并发数一致（对冲时翻倍）"""
+    performance = config.get('performance', {})
+    if performance.get('connection_pool_size'):
+        return max(1, int(performance['connection_pool_size']))
+    max_workers = max(1, int(performance.get('max_concurrent_downloads', 1)))
+    hedging = performance.get('hedging', {}).get('enabled', False)
+    return max_workers * (2 if hedging else 1)
+
+
+class PooledHTTPClient:
+    """带连接池的 requests 会话
+
+    调度器守护进程持有一个实例并注入每次运行的采集器，keep-alive 连接
+    （以及随之省去的DNS解析和TLS握手）在运行之间保留；单次运行时由
+    采集器自己创建。``stats`` 累计请求数、新建连接数和复用率。
+    """
+
+    def __init__(self, config: Optional[Dict] = None, pool_size: Optional[int] = None):
+        config = config or {}
+        self.pool_size = pool_size or default_pool_size(config)
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.adapter = TimedHTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.runs = 0
+        self._lock = threading.Lock()
+
+    def begin_run(self) -> Dict:
+        """标记一次运行开始，返回当前统计的快照（传给 ``run_stats``）"""
+        with self._lock:
+            self.runs += 1
+        return self.stats()
+
+    def stats(self) -> Dict:
+        with self.adapter._stats_lock:
+            requests_count = self.adapter.stats['requests']
+            new_connections = self.adapter.stats['new_connections']
+        return self._summarize(requests_count, new_connections)
+
+    def run_stats(self, since: Dict) -> Dict:
+        """自 ``since`` 快照以来的统计"""
+        current = self.stats()
+        return self._summarize(current['requests'] - since['requests'],
+                               current['new_connections'] - since['new_connections'])
+
+    def _summarize(self, requests_count: int, new_connections: int) -> Dict:
+        reused = max(0, requests_count - new_connections)
+        return {
+            'pool_size': self.pool_size,
+            'runs': self.runs,
+            'requests': requests_count,
+            'new_connections': new_connections,
+            'reused_connections': reused,
+            'reuse_rate': round(reused / requests_count, 4) if requests_count else 0.0
+        }
+
+    def close(self):
+        self.session.close()
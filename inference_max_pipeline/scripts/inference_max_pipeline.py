@@ -6,11 +6,15 @@ InferenceMAX 自动化数据管道
 
 import os
 import sys
+import time
+import fcntl
 import yaml
 import json
 import shutil
 import logging
+import subprocess
 import traceback
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -18,24 +22,93 @@ from pathlib import Path
 sys.path.append('/root/semi-bench')
 
 try:
-    from api_scraper import scrape_api_data
+    from api_scraper import APIDataCollector, scrape_api_data
+    from last_known_good import LastKnownGoodPolicy, load_pending_retry, save_pending_retry
     from clean_json_files import main as clean_main
     from convert_to_separated_csv import main as convert_main
     from join_csv_files import main as join_main
+    from quality_gates import main as quality_main
+    from raw_store import list_raw_files
+    from raw_bundle import SNAPSHOT_FILE, RawSnapshotBundle, load_snapshot
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Please ensure all required scripts are in the correct location")
     sys.exit(1)
 
+# 每个版本归档的输出文件（相对于 paths.output_dir）
+ARCHIVED_FILES = [
+    "inference_max_interactivity.csv",
+    "inference_max_e2e.csv",
+    "inference_max_merged.csv",
+    "SEPARATED_CSV_CONVERSION_REPORT.md",
+    "CSV_MERGE_REPORT.md",
+    "QUALITY_GATE_REPORT.md"
+]
+
+
+@contextmanager
+def pipeline_lock(lock_file, logger=None):
+    """进程间互斥锁（fcntl.flock）
+
+    正常运行和后台重试都会写同一个原始数据目录、CSV输出、校验缓存和
+    原始数据快照包索引，同一时间只允许一个进程执行这些步骤。
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(lock_file)), exist_ok=True)
+    with open(lock_file, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if logger:
+                logger.info(f"等待其他管道进程释放锁: {lock_file}")
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def archive_output_files(output_dir, version_dir, compression=False):
+    """把输出文件复制到版本目录（可选压缩为zip），返回已归档的文件名"""
+    archived_files = []
+    for file_name in ARCHIVED_FILES:
+        source_file = Path(output_dir) / file_name
+        if source_file.exists():
+            target_file = Path(version_dir) / file_name
+            shutil.copy2(source_file, target_file)
+            archived_files.append(file_name)
+
+            # 如果启用压缩，压缩文件
+            if compression:
+                shutil.make_archive(str(target_file.with_suffix('.zip')), 'zip', str(target_file.parent), target_file.name)
+                target_file.unlink()  # 删除原文件
+    return archived_files
+
+
 class InferenceMaxPipeline:
     """InferenceMAX 数据管道主类"""
 
-    def __init__(self, config_file="config/pipeline_config.yaml"):
-        """初始化数据管道"""
+    def __init__(self, config_file="config/pipeline_config.yaml", http_client=None):
+        """初始化数据管道
+
+        ``http_client`` 为调度器守护进程持有的共享HTTP客户端，为空时采集阶段自行创建。
+        """
         self.start_time = datetime.now()
         self.pipeline_id = self.start_time.strftime("%Y%m%d_%H%M%S")
 
+        self.config_file = config_file
         self.config = self.load_config(config_file)
+        self.content_hashes = {}
+        self.data_unchanged = False
+        self.substitutions = []
+        self.retry_pending = []
+        # 采集阶段得出的校验结论，清理阶段据此跳过这些文件的解析
+        self.validated_files = {}
+        # 合并数据集的质量门禁结果（见 quality_gates.run_quality_gates）
+        self.quality_gate = None
+        # 清理阶段之前存入快照包的原始数据（见 capture_raw_payloads），归档时写出快照索引
+        self.raw_capture = None
+        self.fallback = LastKnownGoodPolicy(self.config.get('fallback', {}))
+        self.http_client = http_client
         self.setup_logging()
         self.setup_directories()
 
@@ -115,28 +188,85 @@ class InferenceMaxPipeline:
             self.logger.info(f"输出目录: {output_dir}")
 
             # 执行API采集
-            scrape_results = scrape_api_data(models, sequences, output_dir)
+            scrape_results = scrape_api_data(models, sequences, output_dir, config=self.config,
+                                             http_client=self.http_client)
 
             # 恢复工作目录
             os.chdir(original_cwd)
 
             # 验证采集结果
             raw_data_dir = Path(self.config['paths']['base_dir']) / output_dir
-            json_files = list(raw_data_dir.glob("*.json"))
-            json_files = [f for f in json_files if not any(x in f.name.lower()
-                       for x in ['readme', 'summary', 'cleanup', 'report', 'api_scraping_summary'])]
+            json_files = list_raw_files(str(raw_data_dir))
 
             self.logger.info(f"API采集完成，获得 {len(json_files)} 个JSON文件")
             self.logger.info(f"总记录数: {scrape_results.get('total_records', 0)}")
             self.logger.info(f"b200_trt数据: {scrape_results.get('total_b200_trt', 0)} 条")
 
+            http_cache = scrape_results.get('http_cache', {})
+            if http_cache.get('enabled'):
+                self.logger.info(f"HTTP缓存: 命中 {http_cache.get('hits', 0)} 次，未命中 {http_cache.get('misses', 0)} 次")
+
+            refresh = scrape_results.get('refresh', {})
+            if refresh.get('reused'):
+                self.logger.info(f"增量刷新: 重新采集 {refresh.get('fetched', 0)} 个，沿用有效期内数据 {refresh['reused']} 个")
+
+            request_stats = scrape_results.get('request_stats', {})
+            if request_stats.get('circuit_rejections'):
+                self.logger.warning(f"主机熔断，{request_stats['circuit_rejections']} 个请求被直接拒绝")
+            if request_stats.get('validation_failures'):
+                self.logger.warning(f"下载校验失败 {request_stats['validation_failures']} 次，"
+                                    f"已针对相应组合重新下载 {request_stats.get('refetches', 0)} 次")
+
+            rate_limit = scrape_results.get('rate_limit', {})
+            if rate_limit.get('throttled_requests'):
+                self.logger.info(f"限速: {rate_limit['throttled_requests']} 个请求共等待 {rate_limit['throttled_seconds']:.1f} 秒")
+
+            hedging = scrape_results.get('hedging', {})
+            if hedging.get('enabled'):
+                self.logger.info(f"对冲请求: {hedging['hedged']}/{hedging['requests']} 个请求发出备份, "
+                                 f"{hedging['hedge_wins']} 个由备份请求先返回")
+
+            pool = scrape_results.get('connection_pool', {})
+            if pool.get('requests'):
+                self.logger.info(f"连接池: {pool['reused_connections']}/{pool['requests']} 个请求复用已有连接, "
+                                 f"新建 {pool['new_connections']} 个连接"
+                                 f"{'（共享客户端）' if pool.get('shared') else ''}")
+
             # 检查b200_trt数据
             if scrape_results.get('total_b200_trt', 0) == 0:
                 self.logger.warning("未采集到任何b200_trt数据，可能需要检查网络或API端点")
 
+            # 采集失败、用上次有效数据替代的组合
+            self.validated_files = scrape_results.get('validated_files', {})
+            invalid_records = sum(len(item['validation']['invalid_records'])
+                                  for item in self.validated_files.values())
+            if invalid_records:
+                self.logger.warning(f"采集时发现 {invalid_records} 个不符合结构定义的数据点，将在清理阶段隔离")
+
+            self.substitutions = scrape_results.get('substitutions', [])
+            self.retry_pending = scrape_results.get('retry_pending', [])
+            for item in self.substitutions:
+                self.logger.warning(f"使用替代数据: {item['model']} | {item['sequence']} | {item['data_type']} | "
+                                    f"{item['precision']}（{item['source']}，采集于 {item['substituted_from']}）")
+            unresolved = len(self.retry_pending) - len(self.substitutions)
+            if unresolved > 0:
+                self.logger.warning(f"{unresolved} 个失败的组合没有可用的替代数据")
+
             if len(json_files) < 6:  # 期望的最少文件数
                 raise ValueError(f"采集的文件数量不足: {len(json_files)} < 6")
 
+            # 与上次成功运行的内容哈希比较（使用了替代数据时总是重新生成输出，保证替代标记写入CSV）
+            self.content_hashes = scrape_results.get('content_hashes', {})
+            previous_hashes = self.load_last_run_hashes()
+            self.data_unchanged = (
+                not scrape_results.get('failed_collections')
+                and not self.substitutions
+                and bool(self.content_hashes)
+                and self.content_hashes == previous_hashes
+            )
+            if self.data_unchanged:
+                self.logger.info(f"所有 {len(self.content_hashes)} 个数据文件与上次成功运行完全一致")
+
             return True
 
         except Exception as e:
@@ -144,6 +274,144 @@ class InferenceMaxPipeline:
             self.logger.error(traceback.format_exc())
             return False
 
+    def run_lock(self):
+        """本管道数据目录的进程间锁"""
+        lock_file = Path(self.config['paths']['base_dir']) / self.config['paths']['archive_dir'] / "pipeline.lock"
+        return pipeline_lock(str(lock_file), self.logger)
+
+    def pending_retry_file(self):
+        """等待后台重试的失败组合记录文件"""
+        return Path(self.config['paths']['base_dir']) / self.config['paths']['archive_dir'] / "pending_retry.json"
+
+    def start_background_retry(self):
+        """记录本次失败的组合，并启动独立的后台进程只重试这些组合
+
+        后台进程与本次运行分离（调度器守护进程和一次性运行都适用），重试成功后
+        重新执行清理、转换、合并和归档。没有失败组合时清除旧的记录，
+        仍在等待的后台重试会因此放弃重建。
+        """
+        save_pending_retry(str(self.pending_retry_file()), self.pipeline_id, self.retry_pending)
+        if not self.retry_pending or not self.fallback.background_retry:
+            return
+
+        log_dir = Path(self.config['paths']['base_dir']) / self.config['paths']['log_dir']
+        log_file = open(log_dir / f"retry_{self.pipeline_id}.log", 'a', encoding='utf-8')
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--config', self.config_file, '--retry-failed'],
+            stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True,
+            cwd=self.config['paths']['base_dir']
+        )
+        log_file.close()
+        self.logger.info(f"已启动后台重试: {len(self.retry_pending)} 个失败的组合，"
+                         f"日志 {log_dir / f'retry_{self.pipeline_id}.log'}")
+
+    def retry_failed(self):
+        """后台重试: 只重新采集上次运行中失败的组合，有组合恢复时重建输出并归档
+
+        每轮重试和最后的重建都持有管道锁，轮次之间的等待不持有；每次取得锁后
+        先确认没有更新的运行完成（更新的运行会覆盖待重试记录），否则放弃。
+        """
+        self.log_step("后台重试", "重新采集上次运行中失败的组合")
+
+        pending_file = str(self.pending_retry_file())
+        pending = load_pending_retry(pending_file)
+        if not pending:
+            self.logger.info("没有等待重试的组合")
+            return True
+
+        def superseded():
+            current = load_pending_retry(pending_file)
+            if not current or current['pipeline_id'] != pending['pipeline_id']:
+                self.logger.info("已有更新的管道运行，放弃本次重试")
+                return True
+            return False
+
+        collector = APIDataCollector(self.config, http_client=self.http_client)
+        remaining = pending['combinations']
+        recovered = []
+        validated_files = {}
+        content_hashes = {}
+        try:
+            for attempt in range(1, self.fallback.retry_attempts + 1):
+                if self.fallback.retry_delay:
+                    time.sleep(self.fallback.retry_delay)
+                self.logger.info(f"后台重试第 {attempt}/{self.fallback.retry_attempts} 轮: {len(remaining)} 个组合")
+
+                with self.run_lock():
+                    if superseded():
+                        return True
+                    original_cwd = os.getcwd()
+                    try:
+                        os.chdir(self.config['paths']['base_dir'])
+                        result = collector.retry_combinations(remaining, self.config['paths']['raw_data_dir'])
+                    finally:
+                        os.chdir(original_cwd)
+
+                recovered += result['recovered']
+                remaining = result['remaining']
+                validated_files.update(result['validated_files'])
+                content_hashes.update(result['content_hashes'])
+                if not remaining:
+                    break
+        finally:
+            collector.close()
+
+        self.logger.info(f"后台重试完成: 恢复 {len(recovered)} 个，"
+                         f"仍失败 {len(remaining)} 个（来自运行 {pending['pipeline_id']}）")
+        if not recovered:
+            return False
+
+        with self.run_lock():
+            if superseded():
+                return True
+            save_pending_retry(pending_file, pending['pipeline_id'], remaining)
+            self.validated_files = validated_files
+
+            self.capture_raw_payloads()
+            success = (self.clean_data() and self.convert_to_csv()
+                       and self.join_csv_files() and self.archive_version())
+            if success:
+                # 在失败运行记录的哈希上更新恢复的组合，下次运行不会因替代数据的旧哈希重复重建
+                previous_hashes = self.load_last_run_hashes(pending['pipeline_id'])
+                if previous_hashes:
+                    self.content_hashes = {**previous_hashes, **content_hashes}
+                    self.save_last_run_hashes()
+            self.create_final_report(success)
+        return success
+
+    def last_run_hashes_file(self):
+        """上次成功运行的内容哈希记录文件"""
+        return Path(self.config['paths']['base_dir']) / self.config['paths']['archive_dir'] / "last_run_hashes.json"
+
+    def load_last_run_hashes(self, pipeline_id=None):
+        """读取上次成功运行的内容哈希，不存在（或不是 ``pipeline_id`` 那次运行写入的）时返回空字典"""
+        hashes_file = self.last_run_hashes_file()
+        if not hashes_file.exists():
+            return {}
+
+        try:
+            with open(hashes_file, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            if pipeline_id and record.get('pipeline_id') != pipeline_id:
+                return {}
+            return record.get('content_hashes', {})
+        except Exception as e:
+            self.logger.warning(f"读取上次运行哈希失败: {e}")
+            return {}
+
+    def save_last_run_hashes(self):
+        """记录本次成功运行的内容哈希"""
+        if not self.content_hashes:
+            return
+
+        hashes_file = self.last_run_hashes_file()
+        with open(hashes_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "pipeline_id": self.pipeline_id,
+                "timestamp": self.start_time.isoformat(),
+                "content_hashes": self.content_hashes
+            }, f, indent=2, ensure_ascii=False)
+
     def clean_data(self):
         """步骤2: 清理无效数据"""
         self.log_step("数据清理", "移除无效和小文件")
@@ -153,15 +421,14 @@ class InferenceMaxPipeline:
             os.chdir(self.config['paths']['base_dir'])
 
             self.logger.info("执行数据清理...")
-            clean_main()
+            clean_main(workers=self.config.get('cleanup', {}).get('validation_workers') or None,
+                       verdicts=self.validated_files)
 
             os.chdir(original_cwd)
 
             # 验证清理结果
             raw_data_dir = Path(self.config['paths']['base_dir']) / self.config['paths']['raw_data_dir']
-            valid_files = list(raw_data_dir.glob("*.json"))
-            valid_files = [f for f in valid_files if not any(x in f.name.lower()
-                          for x in ['readme', 'summary', 'cleanup', 'report'])]
+            valid_files = list_raw_files(str(raw_data_dir))
 
             self.logger.info(f"清理完成，保留 {len(valid_files)} 个有效文件")
 
@@ -213,11 +480,16 @@ class InferenceMaxPipeline:
         try:
             original_cwd = os.getcwd()
             os.chdir(self.config['paths']['base_dir'])
+            try:
+                self.logger.info("执行CSV合并...")
+                join_main()
 
-            self.logger.info("执行CSV合并...")
-            join_main()
-
-            os.chdir(original_cwd)
+                # 对合并结果执行质量门禁（按列检查不可能的取值和分组内的离群值）
+                monitoring = self.config['monitoring']
+                if monitoring.get('check_data_quality', True):
+                    self.quality_gate = quality_main(monitoring.get('quality_gates', {}))
+            finally:
+                os.chdir(original_cwd)
 
             # 验证合并结果
             output_dir = Path(self.config['paths']['base_dir']) / self.config['paths']['output_dir']
@@ -241,6 +513,16 @@ class InferenceMaxPipeline:
             else:
                 self.logger.info(f"数据完整性验证通过: {record_count} 条记录")
 
+            gate = self.quality_gate
+            if gate:
+                self.logger.info(f"质量门禁: {gate['status']}，{gate['checked_values']:,} 个指标值，"
+                                 f"空值 {len(gate['missing'])} 个，不可能的取值 {len(gate['impossible'])} 个，离群值 {len(gate['outliers'])} 个，"
+                                 f"耗时 {gate['elapsed_ms']} ms")
+                for violation in gate['violations']:
+                    self.logger.warning(f"质量门禁未通过: {violation}")
+                if gate['status'] == 'fail':
+                    raise ValueError("合并数据未通过质量门禁，详见 QUALITY_GATE_REPORT.md")
+
             return True
 
         except Exception as e:
@@ -265,35 +547,23 @@ class InferenceMaxPipeline:
             version_dir = archive_dir / f"version_{self.pipeline_id}"
             version_dir.mkdir(exist_ok=True)
 
-            # 要归档的文件列表
-            files_to_archive = [
-                "inference_max_interactivity.csv",
-                "inference_max_e2e.csv",
-                "inference_max_merged.csv",
-                "SEPARATED_CSV_CONVERSION_REPORT.md",
-                "CSV_MERGE_REPORT.md"
-            ]
-
-            archived_files = []
-            for file_name in files_to_archive:
-                source_file = output_dir / file_name
-                if source_file.exists():
-                    target_file = version_dir / file_name
-                    shutil.copy2(source_file, target_file)
-                    archived_files.append(file_name)
+            archived_files = archive_output_files(output_dir, version_dir,
+                                                  self.config['versioning'].get('compression', False))
+            for file_name in archived_files:
+                self.logger.info(f"已归档: {file_name}")
 
-                    # 如果启用压缩，压缩文件
-                    if self.config['versioning'].get('compression', False):
-                        shutil.make_archive(str(target_file.with_suffix('.zip')), 'zip', str(target_file.parent), target_file.name)
-                        target_file.unlink()  # 删除原文件
-
-                    self.logger.info(f"已归档: {file_name}")
+            # 原始API响应存入内容寻址的快照包，历史版本可以从原始数据重新生成
+            raw_snapshot = None
+            if self.config['versioning'].get('raw_snapshots', True):
+                raw_snapshot = self.archive_raw_snapshot(version_dir)
 
             # 创建版本元数据
             version_metadata = {
                 "pipeline_id": self.pipeline_id,
                 "timestamp": self.start_time.isoformat(),
                 "archived_files": archived_files,
+                "raw_snapshot": raw_snapshot,
+                "substitutions": self.substitutions,
                 "config": self.config
             }
 
@@ -313,6 +583,50 @@ class InferenceMaxPipeline:
             self.logger.error(traceback.format_exc())
             return False
 
+    def raw_bundle_dir(self):
+        """所有版本共用的原始数据快照包目录"""
+        return Path(self.config['paths']['base_dir']) / self.config['paths']['archive_dir'] / 'raw_bundle'
+
+    def capture_raw_payloads(self):
+        """在清理阶段改写原始数据文件之前，把上游的完整响应存入快照包"""
+        if not (self.config['versioning'].get('enabled', False)
+                and self.config['versioning'].get('raw_snapshots', True)):
+            return
+        raw_dir = Path(self.config['paths']['base_dir']) / self.config['paths']['raw_data_dir']
+        try:
+            self.raw_capture = RawSnapshotBundle(str(self.raw_bundle_dir())).store_payloads(str(raw_dir))
+        except Exception as e:
+            # 归档时会再次尝试（此时只能存入清理后的文件）
+            self.logger.warning(f"清理前存入原始数据快照失败: {e}")
+
+    def archive_raw_snapshot(self, version_dir):
+        """在版本目录写出快照索引（数据块在清理阶段之前已由 capture_raw_payloads 存入快照包）"""
+        bundle = RawSnapshotBundle(str(self.raw_bundle_dir()))
+        capture = self.raw_capture
+        if capture is None:
+            raw_dir = Path(self.config['paths']['base_dir']) / self.config['paths']['raw_data_dir']
+            capture = bundle.store_payloads(str(raw_dir))
+        stats = bundle.write_snapshot(capture, str(version_dir / SNAPSHOT_FILE), self.pipeline_id)
+        self.logger.info(f"原始数据快照: {stats['payloads']} 个组合，新增 {stats['stored']} 个数据块"
+                         f"（{stats['bytes_added']:,} 字节），{stats['deduplicated']} 个与历史版本相同")
+        return stats
+
+    def prune_raw_bundle(self, version_dirs):
+        """删除不再被任何保留版本引用的快照数据块"""
+        bundle_dir = self.raw_bundle_dir()
+        if not bundle_dir.exists():
+            return
+
+        keep_hashes = set()
+        for version_dir in version_dirs:
+            snapshot_file = version_dir / SNAPSHOT_FILE
+            if snapshot_file.exists():
+                keep_hashes.update(entry['hash'] for entry in load_snapshot(str(snapshot_file))['payloads'].values())
+
+        result = RawSnapshotBundle(str(bundle_dir)).prune(keep_hashes)
+        if result['removed']:
+            self.logger.info(f"快照包已清理 {result['removed']} 个数据块，释放 {result['bytes_freed']:,} 字节")
+
     def cleanup_old_versions(self):
         """清理旧版本"""
         max_versions = self.config['versioning'].get('max_versions', 30)
@@ -329,7 +643,13 @@ class InferenceMaxPipeline:
                 except Exception as e:
                     self.logger.warning(f"删除旧版本失败 {old_version.name}: {e}")
 
-    def create_final_report(self, success):
+            remaining = [d for d in version_dirs if d.exists()]
+            try:
+                self.prune_raw_bundle(remaining)
+            except Exception as e:
+                self.logger.warning(f"清理快照包失败: {e}")
+
+    def create_final_report(self, success, no_change=False):
         """创建最终报告"""
         self.log_step("生成报告", f"创建管道执行报告 (成功: {success})")
 
@@ -357,7 +677,11 @@ class InferenceMaxPipeline:
 ## 输出文件
 """
 
-            if success:
+            if no_change:
+                report_content += "### 数据无变化\n"
+                report_content += f"- 全部 {len(self.content_hashes)} 个数据文件与上次成功运行一致\n"
+                report_content += "- 已跳过清理、CSV转换、合并和版本归档，沿用上次的输出文件\n\n"
+            elif success:
                 output_dir = Path(self.config['paths']['base_dir']) / self.config['paths']['output_dir']
 
                 final_files = []
@@ -371,6 +695,24 @@ class InferenceMaxPipeline:
                     report_content += "### 生成的文件\n"
                     report_content += "\n".join(final_files) + "\n\n"
 
+                if self.substitutions:
+                    report_content += "### 替代数据\n"
+                    report_content += "以下组合采集失败，使用最近一次通过校验的数据（合并CSV中 substituted=True）:\n"
+                    for item in self.substitutions:
+                        report_content += (f"- {item['model']} | {item['sequence']} | {item['data_type']} | "
+                                           f"{item['precision']}: {item['source']}，采集于 {item['substituted_from']}\n")
+                    report_content += "\n"
+
+                if self.quality_gate:
+                    gate = self.quality_gate
+                    report_content += "### 数据质量门禁\n"
+                    report_content += f"- 结果: {gate['status']}（耗时 {gate['elapsed_ms']} ms）\n"
+                    report_content += f"- 空的指标值: {len(gate['missing'])} 个（{gate['missing_fraction']:.2%}）\n"
+                    report_content += f"- 不可能的取值: {len(gate['impossible'])} 个\n"
+                    report_content += f"- 离群值: {len(gate['outliers'])} 个（{gate['outlier_fraction']:.2%}）\n"
+                    report_content += "".join(f"- ⚠️ {violation}\n" for violation in gate['violations'])
+                    report_content += "\n"
+
                 if self.config['versioning']['enabled']:
                     report_content += f"### 版本归档\n"
                     report_content += f"- 版本目录: `version_{self.pipeline_id}`\n"
@@ -405,30 +747,45 @@ class InferenceMaxPipeline:
         self.logger.info(f"开始执行 InferenceMAX 数据管道 {self.pipeline_id}")
 
         success = False
+        no_change = False
 
         try:
-            # 步骤1: 数据爬取
-            if not self.scrape_data():
-                return False
-
-            # 步骤2: 数据清理
-            if not self.clean_data():
-                return False
-
-            # 步骤3: CSV转换
-            if not self.convert_to_csv():
-                return False
-
-            # 步骤4: CSV合并
-            if not self.join_csv_files():
-                return False
-
-            # 步骤5: 版本归档
-            if not self.archive_version():
-                return False
-
-            success = True
-            self.logger.info("🎉 数据管道执行成功！")
+            # 采集到归档的全部步骤持有管道锁，与后台重试互斥
+            with self.run_lock():
+                # 步骤1: 数据爬取
+                if not self.scrape_data():
+                    return False
+
+                # 上游数据与上次成功运行完全一致时跳过后续步骤
+                if self.data_unchanged and self.config['versioning'].get('skip_unchanged', True):
+                    self.logger.info("上游数据无变化，跳过清理、转换、合并和归档步骤")
+                    self.start_background_retry()
+                    no_change = True
+                    success = True
+                    return True
+
+                # 步骤2: 数据清理（清理会隔离不合格的数据点，先把上游原始数据存入快照包）
+                self.capture_raw_payloads()
+                if not self.clean_data():
+                    return False
+
+                # 步骤3: CSV转换
+                if not self.convert_to_csv():
+                    return False
+
+                # 步骤4: CSV合并
+                if not self.join_csv_files():
+                    return False
+
+                # 步骤5: 版本归档
+                if not self.archive_version():
+                    return False
+
+                self.save_last_run_hashes()
+                self.start_background_retry()
+
+                success = True
+                self.logger.info("🎉 数据管道执行成功！")
 
         except Exception as e:
             self.logger.error(f"管道执行过程中发生异常: {str(e)}")
@@ -437,7 +794,7 @@ class InferenceMaxPipeline:
 
         finally:
             # 生成最终报告
-            self.create_final_report(success)
+            self.create_final_report(success, no_change)
 
             end_time = datetime.now()
             duration = end_time - self.start_time
@@ -457,6 +814,8 @@ def main():
                        help='配置文件路径')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='详细输出')
+    parser.add_argument('--retry-failed', action='store_true',
+                       help='只重试上次运行中失败的组合（由管道自动在后台启动）')
 
     args = parser.parse_args()
 
@@ -465,7 +824,7 @@ def main():
         pipeline = InferenceMaxPipeline(args.config)
 
         # 执行管道
-        success = pipeline.run()
+        success = pipeline.retry_failed() if args.retry_failed else pipeline.run()
 
         # 设置退出码
         sys.exit(0 if success else 1)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+失败组合的兜底策略 - 用最近一次通过校验的数据替代，并记录待后台重试的组合
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class LastKnownGoodPolicy:
+    """根据配置决定失败组合是否使用替代数据以及如何重试
+
+    配置示例::
+
+        fallback:
+          last_known_good: true
+          max_age_hours: 168
+          background_retry: true
+          retry_attempts: 3
+          retry_delay: 300
+
+    替代数据来自上次写出的原始数据文件或HTTP缓存中的响应体，两者都只在
+    完整通过校验后才会写入；超过 ``max_age_hours``（0 为不限）的数据不使用。
+    """
+
+    def __init__(self, fallback_config: Dict):
+        self.enabled = bool(fallback_config.get('last_known_good', False))
+        self.max_age_hours = float(fallback_config.get('max_age_hours', 0) or 0)
+        self.background_retry = bool(fallback_config.get('background_retry', False))
+        self.retry_attempts = max(1, int(fallback_config.get('retry_attempts', 3)))
+        self.retry_delay = float(fallback_config.get('retry_delay', 300))
+
+    def is_usable(self, source_timestamp: Optional[str]) -> bool:
+        """替代数据的原始采集时间是否在允许范围内"""
+        if not self.max_age_hours:
+            return True
+        age_hours = data_age_hours(source_timestamp)
+        return age_hours is not None and age_hours <= self.max_age_hours
+
+
+def data_age_hours(timestamp: Optional[str]) -> Optional[float]:
+    """ISO时间戳距今的小时数，无法解析时返回None"""
+    try:
+        return (datetime.now() - datetime.fromisoformat(timestamp)).total_seconds() / 3600
+    except (TypeError, ValueError):
+        return None
+
+
+def substitution_metadata(metadata: Dict, source: str, source_timestamp: Optional[str], reason: str) -> Dict:
+    """在原始数据元数据中标记替代数据
+
+    ``substituted_from`` 为替代数据最初采集（或写入缓存）的时间，已经是替代
+    数据的文件保留最初的时间，不会被重复替代刷新。
+    """
+    flagged = dict(metadata)
+    flagged.update({
+        'substituted': True,
+        'substituted_at': datetime.now().isoformat(),
+        'substituted_from': metadata.get('substituted_from') or source_timestamp,
+        'substitution_source': metadata.get('substitution_source') or source,
+        'substitution_reason': reason
+    })
+    return flagged
+
+
+def save_pending_retry(path: str, pipeline_id: str, combinations: List[Dict]):
+    """记录待后台重试的组合；没有失败组合时删除记录"""
+    if not combinations:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'pipeline_id': pipeline_id,
+            'created_at': datetime.now().isoformat(),
+            'combinations': combinations
+        }, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_pending_retry(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
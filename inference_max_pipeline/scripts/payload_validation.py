@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+下载过程中的流式校验 - 边接收边检查 Content-Length 和数据结构
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# 数据点结构定义与清理阶段共用（record_schema 位于项目根目录）
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from record_schema import schema_verdict, validate_data_point
+
+
+class PayloadValidationError(ValueError):
+    """响应体被截断或结构不符合预期"""
+
+
+class StreamValidator:
+    """单次下载的流式校验器
+
+    ``wrap_chunks`` 统计收到的字节数，超过 ``Content-Length`` 立即中止，
+    数据流提前结束时报告截断；``check_item`` 作为 ``decode_json_stream`` 的
+    ``validate`` 回调，遇到非对象元素立即中止，其余元素按 ``record_schema``
+    的结构定义校验；``finish`` 在解码完成后确认至少有一个合格的数据点，
+    ``verdict`` 给出写入元数据的校验结论，清理阶段据此处理而不再重新解析
+    文件。响应经过 gzip 等内容编码时不检查长度（解码后的字节数与
+    Content-Length 不对应）。
+    """
+
+    def __init__(self, expected_length: Optional[int] = None):
+        self.expected_length = expected_length
+        self.received = 0
+        self.items = 0
+        self.valid_items = 0
+        self.invalid_records: List[Dict] = []
+
+    @classmethod
+    def for_response(cls, headers: Dict) -> 'StreamValidator':
+        expected = None
+        if headers.get('Content-Length') and headers.get('Content-Encoding', 'identity') == 'identity':
+            try:
+                expected = int(headers['Content-Length'])
+            except ValueError:
+                expected = None
+        return cls(expected)
+
+    def wrap_chunks(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.received += len(chunk)
+            if self.expected_length is not None and self.received > self.expected_length:
+                raise PayloadValidationError(
+                    f"Received {self.received} bytes, more than Content-Length {self.expected_length}")
+            yield chunk
+
+        if self.expected_length is not None and self.received < self.expected_length:
+            raise PayloadValidationError(
+                f"Truncated body: {self.received} of {self.expected_length} bytes")
+
+    def check_item(self, item):
+        self.items += 1
+        if not isinstance(item, dict):
+            raise PayloadValidationError(f"Data point {self.items} is {type(item).__name__}, expected object")
+        reason = validate_data_point(item)
+        if reason is None:
+            self.valid_items += 1
+        else:
+            self.invalid_records.append({'index': self.items - 1, 'reason': reason})
+
+    def finish(self):
+        if self.items == 0:
+            raise PayloadValidationError("Payload contains no data points")
+        if self.valid_items == 0:
+            raise PayloadValidationError(f"None of {self.items} data points pass schema validation "
+                                         f"({self.invalid_records[0]['reason']})")
+
+    def verdict(self) -> Dict:
+        return schema_verdict(self.items, self.invalid_records)
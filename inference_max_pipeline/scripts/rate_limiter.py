@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+令牌桶限速器 - 所有采集线程共享同一个请求速率上限
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """线程安全的令牌桶
+
+    令牌以 ``rate`` 个/秒的速度补充，最多积累 ``burst`` 个；每个请求消耗一个令牌。
+    主机空闲时积累的令牌允许短时突发，持续请求时总速率不超过 ``rate``。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self) -> float:
+        """取一个令牌，令牌不足时阻塞等待；返回实际等待的秒数
+
+        在锁内预留令牌（余额可以为负），锁外睡眠，等待中的线程按到达顺序依次放行。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if delay:
+                self.waits += 1
+                self.wait_seconds += delay
+
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                'requests_per_second': self.rate,
+                'burst': self.burst,
+                'throttled_requests': self.waits,
+                'throttled_seconds': round(self.wait_seconds, 3)
+            }
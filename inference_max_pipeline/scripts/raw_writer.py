@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+原始数据写入线程池 - 序列化和写文件与网络请求重叠执行
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from raw_store import write_raw_file
+
+
+class RawFileWriterPool:
+    """后台写入原始数据文件
+
+    ``submit`` 立即返回，写入在独立线程中完成（``write_raw_file`` 先写临时文件
+    再原子替换）；排队中的写入超过 ``max_pending`` 时 ``submit`` 阻塞，避免
+    已解码的数据在内存中堆积。读取这些文件之前必须调用 ``flush``。
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: Optional[int] = None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='raw-writer')
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * max_workers)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, filepath: str, metadata: Dict, records: Iterable, metrics: Optional[Dict] = None):
+        """排队写入一个文件；传入 ``metrics`` 时写入完成后记录 ``write_seconds``"""
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, filepath, metadata, records, metrics)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._pending[filepath] = future
+
+    @staticmethod
+    def _write(filepath: str, metadata: Dict, records: Iterable, metrics: Optional[Dict]):
+        start = time.perf_counter()
+        write_raw_file(filepath, metadata, records)
+        if metrics is not None:
+            metrics['write_seconds'] = time.perf_counter() - start
+
+    def flush(self) -> Dict[str, BaseException]:
+        """等待所有已提交的写入完成，返回写入失败的 {文件路径: 异常}"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        wait(pending.values())
+        return {filepath: future.exception() for filepath, future in pending.items()
+                if future.exception() is not None}
+
+    def shutdown(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+增量刷新策略 - 按模型/组合配置原始数据的有效期（TTL）
+"""
+
+from typing import Dict
+
+
+class RefreshPolicy:
+    """根据配置决定每个组合的数据可以沿用多久
+
+    配置示例::
+
+        refresh:
+          enabled: true
+          default_ttl_hours: 0
+          models:
+            "DeepSeek R1 0528": 168
+          combinations:
+            "gpt-oss 120B|1K / 1K": 1
+            "gpt-oss 120B|1K / 1K|e2e": 0.5
+
+    查找顺序为 模型|序列|数据类型 → 模型|序列 → 模型 → 默认值；
+    TTL 为 0 表示每次运行都重新采集。
+    """
+
+    def __init__(self, refresh_config: Dict):
+        self.enabled = bool(refresh_config.get('enabled', False))
+        self.default_ttl_hours = float(refresh_config.get('default_ttl_hours', 0) or 0)
+        self.model_ttls = refresh_config.get('models') or {}
+        self.combination_ttls = refresh_config.get('combinations') or {}
+
+    def ttl_hours(self, model: str, sequence: str, data_type: str) -> float:
+        """组合的有效期（小时）"""
+        if not self.enabled:
+            return 0.0
+
+        for key in (f"{model}|{sequence}|{data_type}", f"{model}|{sequence}"):
+            if key in self.combination_ttls:
+                return float(self.combination_ttls[key] or 0)
+        if model in self.model_ttls:
+            return float(self.model_ttls[model] or 0)
+        return self.default_ttl_hours
+
+    def is_fresh(self, model: str, sequence: str, data_type: str, age_hours: float) -> bool:
+        """数据年龄是否仍在有效期内"""
+        ttl = self.ttl_hours(model, sequence, data_type)
+        return ttl > 0 and age_hours < ttl
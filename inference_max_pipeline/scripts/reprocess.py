@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+离线重建历史版本 - 从原始数据快照包重放 清理 → CSV转换 → 合并
+
+不访问网络：每个版本的原始数据从 archive_dir/raw_bundle 还原到临时目录，
+依次执行与管道相同的三个步骤，再把生成的文件写回版本目录（--in-place）
+或 archive_dir/reprocessed/ 下的同名目录。各版本在进程池中并行处理
+（各步骤依赖当前工作目录，因此使用进程而不是线程）。
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from clean_json_files import main as clean_main
+from convert_to_separated_csv import main as convert_main
+from join_csv_files import main as join_main
+from quality_gates import main as quality_main
+from raw_bundle import SNAPSHOT_FILE, RawSnapshotBundle, load_snapshot
+
+from inference_max_pipeline import archive_output_files
+
+
+def reprocess_version(version_dir: str, bundle_dir: str, target_dir: str,
+                      raw_data_dir: str, output_dir: str, compression: bool,
+                      quality_gates: Optional[Dict] = None) -> Dict:
+    """在临时目录中重建单个版本，返回处理结果
+
+    ``quality_gates`` 为 monitoring.quality_gates 配置，None 表示不执行质量门禁。
+    """
+    start = time.perf_counter()
+    version = os.path.basename(version_dir)
+    work_dir = tempfile.mkdtemp(prefix=f"reprocess_{version}_")
+    original_cwd = os.getcwd()
+
+    try:
+        snapshot = load_snapshot(os.path.join(version_dir, SNAPSHOT_FILE))
+        bundle = RawSnapshotBundle(bundle_dir)
+        restored = bundle.restore(snapshot, os.path.join(work_dir, raw_data_dir))
+
+        os.makedirs(target_dir, exist_ok=True)
+        os.chdir(work_dir)
+        with open(os.path.join(target_dir, 'reprocess.log'), 'w', encoding='utf-8') as log, redirect_stdout(log):
+            clean_main(workers=1)  # 各版本已在独立进程中并行，不再嵌套进程池
+            convert_main()
+            join_main()
+            # 与管道相同，重新生成 QUALITY_GATE_REPORT.md，--in-place 时不会留下旧版本的报告
+            gate = quality_main(quality_gates) if quality_gates is not None else None
+        os.chdir(original_cwd)
+
+        if gate and gate['status'] == 'fail':
+            raise RuntimeError("merged data failed the quality gates, see reprocess.log")
+
+        archived = archive_output_files(os.path.join(work_dir, output_dir), target_dir, compression)
+        if 'inference_max_merged.csv' not in archived:
+            raise RuntimeError("join stage produced no merged CSV, see reprocess.log")
+
+        return {
+            'version': version,
+            'success': True,
+            'payloads': len(restored),
+            'archived_files': archived,
+            'quality_gate': gate['status'] if gate else None,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+
+    except Exception as e:
+        return {
+            'version': version,
+            'success': False,
+            'error': f"{e}\n{traceback.format_exc()}",
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def find_versions(archive_dir: Path, names: List[str]) -> List[Path]:
+    """有快照索引的版本目录（按名称筛选），按时间顺序"""
+    versions = sorted(d for d in archive_dir.iterdir()
+                      if d.is_dir() and d.name.startswith('version_') and (d / SNAPSHOT_FILE).exists())
+    if names:
+        wanted = {name if name.startswith('version_') else f"version_{name}" for name in names}
+        versions = [d for d in versions if d.name in wanted]
+    return versions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从原始数据快照离线重建历史版本')
+    parser.add_argument('--config', '-c',
+                        default=str(Path(__file__).resolve().parent.parent / 'config' / 'pipeline_config.yaml'),
+                        help='管道配置文件路径')
+    parser.add_argument('versions', nargs='*', help='要重建的版本（如 20251024_110000），默认全部')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='并行进程数')
+    parser.add_argument('--in-place', action='store_true', help='覆盖原版本目录中的文件')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    base_dir = Path(config['paths']['base_dir'])
+    archive_dir = base_dir / config['paths']['archive_dir']
+    bundle_dir = archive_dir / 'raw_bundle'
+    compression = config['versioning'].get('compression', False)
+    monitoring = config.get('monitoring', {})
+    quality_gates = monitoring.get('quality_gates', {}) if monitoring.get('check_data_quality', True) else None
+
+    versions = find_versions(archive_dir, args.versions)
+    if not versions:
+        print(f"❌ No archived versions with raw snapshots found in {archive_dir}")
+        sys.exit(1)
+
+    output_root = archive_dir if args.in_place else archive_dir / 'reprocessed'
+    print(f"🔁 Reprocessing {len(versions)} versions with {args.workers} workers → {output_root}")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(reprocess_version, str(version), str(bundle_dir), str(output_root / version.name),
+                            config['paths']['raw_data_dir'], config['paths']['output_dir'], compression,
+                            quality_gates)
+            for version in versions
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if result['success']:
+            print(f"✅ {result['version']}: {result['payloads']} payloads, "
+                  f"{len(result['archived_files'])} files ({result['seconds']:.2f}s)")
+        else:
+            print(f"❌ {result['version']}: {result['error'].splitlines()[0]}")
+
+    summary = {
+        'timestamp': datetime.now().isoformat(),
+        'in_place': args.in_place,
+        'elapsed_seconds': round(elapsed, 3),
+        'versions': results
+    }
+    os.makedirs(output_root, exist_ok=True)
+    with open(output_root / 'reprocess_summary.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    failed = [r for r in results if not r['success']]
+    print(f"\n🎉 Reprocessed {len(results) - len(failed)}/{len(results)} versions in {elapsed:.1f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
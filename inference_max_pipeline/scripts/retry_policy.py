@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+请求重试策略与按主机的熔断器
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RetryPolicy:
+    """指数退避 + 抖动的重试策略
+
+    第 n 次重试前等待 ``base_delay * 2**(n-1)``（不超过 ``max_delay``），
+    再乘以 [0.5, 1.0) 之间的随机因子，避免并发请求同时重试。
+    """
+
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 5, max_delay: float = 60):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        """HTTP状态码是否值得重试（404等客户端错误不重试）"""
+        return status_code in self.RETRYABLE_STATUS_CODES
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间（秒），attempt 从1开始"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+
+class CircuitOpenError(Exception):
+    """目标主机熔断中，请求被直接拒绝"""
+
+
+class CircuitBreaker:
+    """按主机统计连续失败次数的熔断器
+
+    连续失败达到 ``failure_threshold`` 次后熔断 ``cooldown`` 秒，期间该主机
+    的请求直接失败；冷却结束后进入半开状态，只放行一个试探请求，其他并发
+    请求在试探结果（``record_success``/``record_failure``）返回前仍被拒绝。
+    试探成功即恢复，失败则重新熔断。试探请求超过 ``cooldown`` 秒仍未报告
+    结果时视为丢失，再放行下一个。
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 60):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = float(cooldown)
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        # 半开状态下正在进行的试探请求：主机 → 放行时间
+        self._probe_in_flight: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _open_remaining(self, host: str, now: float) -> Optional[float]:
+        """熔断剩余的秒数；未熔断时为None，冷却已结束（半开）时为0"""
+        opened_at = self._opened_at.get(host)
+        if opened_at is None:
+            return None
+        return max(0.0, self.cooldown - (now - opened_at))
+
+    def check(self, host: str):
+        """请求前检查，主机熔断中（或半开状态已有试探请求）时抛出 CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            remaining = self._open_remaining(host, now)
+            if remaining is None:
+                return
+            if remaining > 0:
+                raise CircuitOpenError(f"Circuit open for {host}, retry in {remaining:.0f}s")
+
+            probe_started = self._probe_in_flight.get(host)
+            if probe_started is not None and now - probe_started < self.cooldown:
+                raise CircuitOpenError(f"Circuit half-open for {host}, waiting for the probe request")
+            self._probe_in_flight[host] = now
+
+    def record_success(self, host: str):
+        """记录一次成功请求，关闭熔断"""
+        with self._lock:
+            self._failures[host] = 0
+            self._opened_at.pop(host, None)
+            self._probe_in_flight.pop(host, None)
+
+    def record_failure(self, host: str):
+        """记录一次失败请求，达到阈值时（重新）熔断"""
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            self._probe_in_flight.pop(host, None)
+            if self._failures[host] >= self.failure_threshold:
+                self._opened_at[host] = time.monotonic()
+
+    def is_open(self, host: str) -> bool:
+        """主机当前是否处于熔断状态（只查询，不占用半开状态的试探名额）"""
+        with self._lock:
+            remaining = self._open_remaining(host, time.monotonic())
+            return remaining is not None and (remaining > 0 or host in self._probe_in_flight)
@@ -19,6 +19,7 @@ sys.path.append('/root/semi-bench')
 sys.path.append('/root/semi-bench/inference_max_pipeline/scripts')
 
 from inference_max_pipeline import InferenceMaxPipeline
+from http_client import PooledHTTPClient
 
 class PipelineScheduler:
     """数据管道调度器"""
@@ -28,6 +29,8 @@ class PipelineScheduler:
         self.config = self.load_config(config_file)
         self.setup_logging()
         self.pipeline = None
+        # 调度器持有的长期HTTP客户端，注入每次管道运行，keep-alive 连接在运行之间复用
+        self.http_client = PooledHTTPClient(self.config)
 
         self.logger = logging.getLogger('PipelineScheduler')
         self.logger.info("Pipeline Scheduler initialized")
@@ -67,11 +70,15 @@ class PipelineScheduler:
             self.logger.info("="*60)
 
             # 初始化管道
-            self.pipeline = InferenceMaxPipeline()
+            self.pipeline = InferenceMaxPipeline(http_client=self.http_client)
 
             # 执行管道
             success = self.pipeline.run()
 
+            pool = self.http_client.stats()
+            self.logger.info(f"共享连接池累计: {pool['runs']} 次运行, {pool['requests']} 个请求, "
+                             f"复用率 {pool['reuse_rate']:.1%}, 新建 {pool['new_connections']} 个连接")
+
             if success:
                 self.logger.info("✅ 定时管道执行成功")
             else:
@@ -178,6 +185,8 @@ class PipelineScheduler:
         except Exception as e:
             self.logger.error(f"调度器守护进程异常: {e}")
             raise
+        finally:
+            self.http_client.close()
 
     def run_once(self):
         """立即执行一次"""
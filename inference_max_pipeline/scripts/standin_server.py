@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+InferenceMAX API 本地替身服务器
+
+按与 APIDataCollector.base_url 相同的URL布局提供已采集的数据，用于离线
+基准测试和回归测试。支持：
+
+- serve: 提供 json_data/raw_json_files 中的数据和录制的响应，可注入延迟、
+  带宽限制、HTTP错误和截断的响应体
+- record: 作为代理转发到线上服务并录制响应
+- benchmark: 启动替身服务器，测量采集器的吞吐量
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import logging
+import tempfile
+import argparse
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+import yaml
+
+from api_scraper import DEFAULT_API_BASE_URL, APIDataCollector
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from raw_store import list_raw_files, load_raw_file
+
+API_PATH = urlparse(DEFAULT_API_BASE_URL).path
+UPSTREAM_ORIGIN = DEFAULT_API_BASE_URL[:-len(API_PATH)]
+
+
+class FaultProfile:
+    """故障注入配置"""
+
+    def __init__(self, latency_ms: float = 0, latency_jitter_ms: float = 0,
+                 bandwidth_kbps: float = 0, error_rate: float = 0, error_status: int = 503,
+                 truncate_rate: float = 0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.truncate_rate = truncate_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def latency(self) -> float:
+        """本次响应前的延迟（秒）"""
+        with self._lock:
+            jitter = self._random.uniform(0, self.latency_jitter_ms) if self.latency_jitter_ms else 0
+        return (self.latency_ms + jitter) / 1000
+
+    def should_fail(self) -> bool:
+        return self._roll(self.error_rate)
+
+    def should_truncate(self) -> bool:
+        return self._roll(self.truncate_rate)
+
+
+class PayloadStore:
+    """URL路径 → 响应体
+
+    录制目录中的文件优先（按URL路径原样保存的原始字节），其次是原始数据目录
+    中按 metadata.url 还原的紧凑JSON。
+    """
+
+    def __init__(self, raw_data_dir: str, recordings_dir: Optional[str] = None):
+        self.recordings_dir = recordings_dir
+        self.payloads: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+        for filepath in list_raw_files(raw_data_dir):
+            try:
+                file_data = load_raw_file(filepath)
+            except Exception as e:
+                logging.warning(f"Skipping unreadable raw file {filepath}: {e}")
+                continue
+            url = file_data.get('metadata', {}).get('url')
+            if url and 'data' in file_data:
+                self.payloads[urlparse(url).path] = json.dumps(
+                    file_data['data'], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        if recordings_dir and os.path.isdir(recordings_dir):
+            for root, _, files in os.walk(recordings_dir):
+                for name in files:
+                    filepath = os.path.join(root, name)
+                    path = '/' + os.path.relpath(filepath, recordings_dir).replace(os.sep, '/')
+                    with open(filepath, 'rb') as f:
+                        self.payloads[path] = f.read()
+
+    def get(self, path: str) -> Optional[bytes]:
+        with self._lock:
+            return self.payloads.get(path)
+
+    def record(self, path: str, body: bytes):
+        """保存一次线上响应"""
+        with self._lock:
+            self.payloads[path] = body
+        if self.recordings_dir:
+            filepath = os.path.join(self.recordings_dir, *path.lstrip('/').split('/'))
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, 'wb') as f:
+                f.write(body)
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """客户端提前断开连接（如端点探测只读取响应头）时不打印异常堆栈"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            logging.debug(f"standin: client {client_address} disconnected early")
+            return
+        super().handle_error(request, client_address)
+
+
+class StandinServer:
+    """在后台线程中运行的替身服务器"""
+
+    def __init__(self, store: PayloadStore, faults: FaultProfile, host: str = '127.0.0.1',
+                 port: int = 0, upstream: Optional[str] = None):
+        self.store = store
+        self.faults = faults
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.stats = {'requests': 0, 'not_modified': 0, 'errors': 0, 'truncated': 0,
+                      'not_found': 0, 'recorded': 0, 'bytes_sent': 0}
+        self._stats_lock = threading.Lock()
+        self.httpd = _QuietHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _fetch_upstream(self, path: str) -> Optional[bytes]:
+        """录制模式：从线上服务获取并保存响应"""
+        try:
+            response = requests.get(f"{self.upstream}{path}", timeout=30)
+        except requests.RequestException as e:
+            logging.warning(f"Upstream request failed for {path}: {e}")
+            return None
+        if response.status_code != 200:
+            return None
+        self.store.record(path, response.content)
+        self._count('recorded')
+        return response.content
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logging.debug("standin: " + format % args)
+
+            def _send_empty(self, status: int):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_GET(self):
+                server._count('requests')
+                path = urlparse(self.path).path
+
+                time.sleep(server.faults.latency())
+
+                if server.faults.should_fail():
+                    server._count('errors')
+                    self._send_empty(server.faults.error_status)
+                    return
+
+                # 录制模式优先转发到线上服务，失败时回退到本地数据
+                body = server._fetch_upstream(path) if server.upstream else None
+                if body is None:
+                    body = server.store.get(path)
+                if body is None:
+                    server._count('not_found')
+                    self._send_empty(404)
+                    return
+
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+                if self.headers.get('If-None-Match') == etag:
+                    server._count('not_modified')
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                truncate = server.faults.should_truncate()
+                sent = body[:len(body) // 2] if truncate else body
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+
+                self._write_throttled(sent)
+                server._count('bytes_sent', len(sent))
+                if truncate:
+                    # 声明的长度大于实际发送的字节数，断开连接模拟传输中断
+                    server._count('truncated')
+                    self.close_connection = True
+
+            def _write_throttled(self, body: bytes):
+                bandwidth = server.faults.bandwidth_kbps * 1024
+                if not bandwidth:
+                    self.wfile.write(body)
+                    return
+                chunk_size = max(1024, int(bandwidth / 20))
+                for start in range(0, len(body), chunk_size):
+                    chunk = body[start:start + chunk_size]
+                    self.wfile.write(chunk)
+                    time.sleep(len(chunk) / bandwidth)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def load_pipeline_config(config_file: str) -> Dict:
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def run_benchmark(server: StandinServer, config: Dict, runs: int, http_cache: bool,
+                  hedging: bool = False) -> Dict:
+    """对替身服务器执行多次完整采集，统计耗时和吞吐量"""
+    models = config['targets']['models']
+    sequences = config['targets']['sequences']
+    work_dir = tempfile.mkdtemp(prefix='standin_bench_')
+
+    bench_config = json.loads(json.dumps(config))
+    bench_config.setdefault('source', {})['api_base_url'] = server.base_url
+    bench_config.setdefault('cache', {}).update({
+        'http_cache_enabled': http_cache,
+        'http_cache_dir': os.path.join(work_dir, 'http_cache')
+    })
+    bench_config.setdefault('discovery', {})['manifest_file'] = os.path.join(work_dir, 'endpoint_manifest.json')
+    bench_config.setdefault('refresh', {})['enabled'] = False
+    bench_config.setdefault('performance', {}).setdefault('hedging', {})['enabled'] = hedging
+
+    timings = []
+    results = None
+    try:
+        if bench_config['discovery'].get('enabled', False):
+            # 端点探测只做一次，不计入采集耗时
+            collector = APIDataCollector(bench_config)
+            collector.discover_endpoints(models, sequences)
+
+        for run in range(1, runs + 1):
+            output_dir = os.path.join(work_dir, f"run_{run}")
+            collector = APIDataCollector(bench_config)
+            start = time.perf_counter()
+            results = collector.collect_all_data(models, sequences, output_dir)
+            elapsed = time.perf_counter() - start
+            timings.append(elapsed)
+            print(f"🏁 Run {run}/{runs}: {elapsed:.2f}s, {results['total_files']} files, "
+                  f"{results['total_records']} records")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    median = statistics.median(timings)
+    return {
+        'runs': runs,
+        'median_seconds': median,
+        'min_seconds': min(timings),
+        'max_seconds': max(timings),
+        'files_per_second': results['total_files'] / median if median else 0,
+        'records_per_second': results['total_records'] / median if median else 0,
+        'failed_combinations': len(results['failed_collections']),
+        'hedging': results['hedging'],
+        'server': dict(server.stats)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='InferenceMAX API 本地替身服务器')
+    parser.add_argument('mode', choices=['serve', 'record', 'benchmark'], help='运行模式')
+    parser.add_argument('--config', '-c',
+                        default=str(Path(__file__).resolve().parent.parent / 'config' / 'pipeline_config.yaml'),
+                        help='管道配置文件路径')
+    parser.add_argument('--raw-dir', default='json_data/raw_json_files', help='提供数据的原始数据目录')
+    parser.add_argument('--recordings-dir', default='json_data/standin_recordings', help='录制响应的保存目录')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口（benchmark 模式默认随机端口）')
+    parser.add_argument('--upstream', default=UPSTREAM_ORIGIN, help='record 模式转发的线上地址')
+    parser.add_argument('--latency-ms', type=float, default=0, help='每个响应的固定延迟（毫秒）')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0, help='额外的随机延迟上限（毫秒）')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='每个连接的带宽上限（KB/s），0 为不限')
+    parser.add_argument('--error-rate', type=float, default=0, help='返回HTTP错误的概率')
+    parser.add_argument('--error-status', type=int, default=503, help='注入错误时的状态码')
+    parser.add_argument('--truncate-rate', type=float, default=0, help='截断响应体的概率')
+    parser.add_argument('--seed', type=int, help='故障注入的随机种子')
+    parser.add_argument('--runs', type=int, default=3, help='benchmark 模式的采集次数')
+    parser.add_argument('--http-cache', action='store_true', help='benchmark 时启用HTTP条件请求缓存')
+    parser.add_argument('--hedging', action='store_true', help='benchmark 时启用对冲请求')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    faults = FaultProfile(args.latency_ms, args.latency_jitter_ms, args.bandwidth_kbps,
+                          args.error_rate, args.error_status, args.truncate_rate, args.seed)
+    store = PayloadStore(args.raw_dir, args.recordings_dir)
+    upstream = args.upstream if args.mode == 'record' else None
+    port = 0 if args.mode == 'benchmark' and args.port == 8765 else args.port
+    server = StandinServer(store, faults, args.host, port, upstream)
+
+    print(f"🧪 Stand-in server: {server.base_url} ({len(store)} payloads)")
+
+    if args.mode == 'benchmark':
+        server.start()
+        try:
+            summary = run_benchmark(server, load_pipeline_config(args.config), args.runs,
+                                    args.http_cache, args.hedging)
+        finally:
+            server.stop()
+        print(f"\n📈 Benchmark ({summary['runs']} runs):")
+        print(f"  Median: {summary['median_seconds']:.2f}s "
+              f"(min {summary['min_seconds']:.2f}s, max {summary['max_seconds']:.2f}s)")
+        print(f"  Throughput: {summary['files_per_second']:.1f} files/s, "
+              f"{summary['records_per_second']:.0f} records/s")
+        print(f"  Failed combinations (last run): {summary['failed_combinations']}")
+        if summary['hedging']['enabled']:
+            print(f"  Hedging (last run): {summary['hedging']}")
+        print(f"  Server: {summary['server']}")
+        return
+
+    if args.mode == 'record':
+        print(f"📼 Recording misses from {args.upstream} into {args.recordings_dir}")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n替身服务器已停止")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
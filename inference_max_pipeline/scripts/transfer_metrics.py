@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+请求耗时分解 - 记录每个URL的连接、首字节、传输、解码和写文件耗时
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+TIMING_FIELDS = ('connect_seconds', 'ttfb_seconds', 'transfer_seconds', 'decode_seconds', 'write_seconds')
+# 每个组合×精度变体一条时间序列；标签集合重复时 node_exporter 会拒绝整个文件
+METRIC_LABELS = ('model', 'sequence', 'data_type', 'precision', 'cache')
+
+# 建立连接发生在发起请求的线程内，用线程局部变量把耗时交回适配器
+_local = threading.local()
+
+
+class _TimedConnectMixin:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _local.connect_seconds = getattr(_local, 'connect_seconds', 0.0) + time.perf_counter() - start
+            _local.connections = getattr(_local, 'connections', 0) + 1
+
+
+class _TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """记录建连耗时的HTTP适配器
+
+    每个响应带有 ``connect_seconds`` 属性（TCP连接和TLS握手耗时，复用连接池中的
+    连接时为0）；首字节耗时使用 requests 自带的 ``response.elapsed``。
+    ``stats`` 累计请求数和新建连接数，用于统计连接复用率。
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.stats = {'requests': 0, 'new_connections': 0}
+        self._stats_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+    def send(self, request, **kwargs):
+        _local.connect_seconds = 0.0
+        _local.connections = 0
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            with self._stats_lock:
+                self.stats['requests'] += 1
+                self.stats['new_connections'] += _local.connections
+        response.connect_seconds = _local.connect_seconds
+        return response
+
+
+def new_request_metrics(url: str) -> Dict:
+    """单个请求的指标条目"""
+    metrics = {'url': url, 'status': None, 'cache': None, 'bytes': 0}
+    metrics.update({field: 0.0 for field in TIMING_FIELDS})
+    return metrics
+
+
+def timed_chunks(chunks: Iterable[bytes], metrics: Dict) -> Iterator[bytes]:
+    """包装响应体迭代器，把等待数据块的时间累计到 ``transfer_seconds``"""
+    iterator = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            metrics['transfer_seconds'] += time.perf_counter() - start
+            return
+        metrics['transfer_seconds'] += time.perf_counter() - start
+        yield chunk
+
+
+def summarize(requests_metrics: List[Dict]) -> Dict:
+    """汇总所有请求的耗时和字节数"""
+    totals = {field: round(sum(m.get(field, 0.0) for m in requests_metrics), 4) for field in TIMING_FIELDS}
+    totals['bytes'] = sum(m.get('bytes', 0) for m in requests_metrics)
+    totals['requests'] = len(requests_metrics)
+    return totals
+
+
+def _escape_label(value) -> str:
+    if value is None:
+        return ''
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_prometheus_textfile(path: str, requests_metrics: List[Dict]):
+    """按 node_exporter textfile 采集器的格式写出指标（先写临时文件再原子替换）"""
+    lines = []
+    for field in TIMING_FIELDS + ('bytes',):
+        name = f"inferencemax_fetch_{field}"
+        lines.append(f"# TYPE {name} gauge")
+        for metrics in requests_metrics:
+            labels = ','.join(f'{label}="{_escape_label(metrics.get(label))}"' for label in METRIC_LABELS)
+            lines.append(f"{name}{{{labels}}} {metrics.get(field, 0)}")
+
+    totals = summarize(requests_metrics)
+    lines.append("# TYPE inferencemax_fetch_requests gauge")
+    lines.append(f"inferencemax_fetch_requests {totals['requests']}")
+    lines.append("# TYPE inferencemax_fetch_last_run_timestamp_seconds gauge")
+    lines.append(f"inferencemax_fetch_last_run_timestamp_seconds {time.time():.0f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
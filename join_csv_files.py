@@ -77,6 +77,11 @@ def join_csv_files(e2e_data, interactivity_data, key_fields):
                     if 'y' in inter_row:
                         joined_row['inter_y'] = inter_row['y']
 
+                    # 任一侧来自替代数据时，合并后的行也标记为替代数据
+                    if inter_row.get('substituted') == 'True' and joined_row.get('substituted') != 'True':
+                        joined_row['substituted'] = 'True'
+                        joined_row['substituted_from'] = inter_row.get('substituted_from', '')
+
                     joined_data.append(joined_row)
 
             matched_keys += 1
@@ -130,15 +135,20 @@ def join_csv_files(e2e_data, interactivity_data, key_fields):
 
             inter_only_keys += 1
 
+    substituted_records = sum(1 for row in joined_data if row.get('substituted') == 'True')
+
     print(f"✅ Matched keys: {matched_keys}")
     print(f"⚠️  E2E only keys: {e2e_only_keys}")
     print(f"⚠️  Interactivity only keys: {inter_only_keys}")
     print(f"📊 Total joined records: {len(joined_data)}")
+    if substituted_records:
+        print(f"⚠️  Records from last-known-good data: {substituted_records}")
 
     return joined_data, {
         'matched_keys': matched_keys,
         'e2e_only_keys': e2e_only_keys,
         'inter_only_keys': inter_only_keys,
+        'substituted_records': substituted_records,
         'total_records': len(joined_data)
     }
 
@@ -214,6 +224,7 @@ def create_join_summary(stats, validation_stats, output_file):
 - **匹配的键数量**: {stats['matched_keys']}
 - **仅E2E的键数量**: {stats['e2e_only_keys']}
 - **仅Interactivity的键数量**: {stats['inter_only_keys']}
+- **替代数据记录数**: {stats['substituted_records']}
 - **总记录数**: {stats['total_records']}
 
 ## 📋 数据完整性验证
@@ -239,6 +250,7 @@ def create_join_summary(stats, validation_stats, output_file):
 合并后的CSV文件包含：
 - 所有来自E2E文件的原始列（除了x和y）
 - 4个新列：e2e_x, e2e_y, inter_x, inter_y
+- substituted / substituted_from：该行（任一侧）是否来自采集失败时替代的上次有效数据及其原始采集时间
 - 对于无法匹配的记录，相应字段为空值
 
 ## 🔍 使用建议
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+合并数据集的质量门禁 - 按列检查不可能出现的取值，并按分组计算稳健z分数
+
+合并CSV用 pandas 读入，每项检查都是对整列的向量化运算，不构建逐行字典。
+分组（模型×序列×hwKey×精度）内的指标跨越多个数量级（并发数从4到512），
+稳健z分数在对数尺度上计算：
+
+    z = 0.6745 * (ln(v) - median) / MAD
+
+MAD 为组内对数值与中位数之差的绝对值的中位数（Iglewicz-Hoaglin 修正z分数），
+中位数和 MAD 都用 ``groupby(...).transform('median')`` 按组计算。
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# 参与检查的数值列；所有指标都必须是有限的正数
+METRIC_COLUMNS = ('e2e_x', 'e2e_y', 'inter_x', 'inter_y', 'tpPerGpu_y', 'tpPerMw_y',
+                  'costh_y', 'costn_y', 'costr_y')
+GROUP_KEYS = ('model_name', 'sequence_length', 'hwKey', 'precision')
+
+DEFAULT_GATE_CONFIG = {
+    'action': 'warn',             # warn: 只记录；fail: 未通过时管道失败
+    'z_threshold': 3.5,           # |z| 超过该值记为离群值
+    'min_group_size': 5,          # 数据点少于该值的分组不计算z分数
+    'max_outlier_fraction': 0.01, # 离群值占全部检查值的比例上限
+    'max_impossible_values': 0,   # 不可能取值的数量上限
+    'max_missing_fraction': 0.05  # 空单元格占全部指标单元格的比例上限
+}
+
+# 报告中每类问题最多列出的条目数
+REPORT_LIMIT = 50
+
+
+def load_table(csv_file):
+    """读入合并CSV：``text`` 为原始文本（供分组和报告使用），``values`` 为指标列的 float64
+
+    空值和无法解析的值在 ``values`` 中为 NaN。CSV中不存在的列记入 ``missing_columns``
+    并跳过：缺指标列时只检查其余指标，缺分组键时不计算z分数。
+    """
+    text = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+    missing_columns = [name for name in GROUP_KEYS + METRIC_COLUMNS if name not in text.columns]
+    for name in ('conc',) + GROUP_KEYS:
+        if name not in text.columns:
+            text[name] = ''  # 报告中缺失的分组键和并发数显示为空
+
+    values = pd.DataFrame({name: pd.to_numeric(text[name], errors='coerce')
+                           for name in METRIC_COLUMNS if name not in missing_columns},
+                          index=text.index)
+    return {'text': text, 'values': values, 'missing_columns': missing_columns}
+
+
+def _findings(table, rows, name, detail_key, details):
+    """把行号数组转换成报告条目"""
+    text = table['text']
+    return [{
+        'row': int(row),
+        'column': name,
+        'value': text[name].iat[row],
+        detail_key: detail,
+        'group': tuple(text[key].iat[row] for key in GROUP_KEYS),
+        'conc': text['conc'].iat[row]
+    } for row, detail in zip(rows, details)]
+
+
+def find_missing_values(table):
+    """空的指标单元格
+
+    join_csv_files 对另一张表中没有对应键的行写入空的 inter_*/e2e_* 值，
+    空单元格因此单独计数，不算作不可能的取值。
+    """
+    findings = []
+    for name in table['values'].columns:
+        rows = np.flatnonzero(table['text'][name].to_numpy() == '')
+        findings.extend(_findings(table, rows, name, 'reason', ['missing'] * len(rows)))
+    return findings
+
+
+def find_impossible_values(table):
+    """不是有限正数的非空指标值（非数值、无穷大、零或负数）"""
+    findings = []
+    for name, column in table['values'].items():
+        values = column.to_numpy()
+        # NaN 与任何数比较都为假，一次比较即可同时找出无法解析和越界的值
+        with np.errstate(invalid='ignore'):
+            impossible = ~((values > 0) & (values < np.inf)) & (table['text'][name].to_numpy() != '')
+        rows = np.flatnonzero(impossible)
+        if not len(rows):
+            continue
+        reasons = np.select([np.isnan(values[rows]), np.isinf(values[rows])],
+                            ['non-numeric', 'non-finite'], 'non-positive')
+        findings.extend(_findings(table, rows, name, 'reason', reasons.tolist()))
+    return findings
+
+
+def find_outliers(table, z_threshold, min_group_size):
+    """按分组在对数尺度上计算稳健z分数，返回 (离群值列表, 参与检查的值数, 检查的分组数)"""
+    if any(key in table['missing_columns'] for key in GROUP_KEYS):
+        return [], 0, 0
+    keys = [table['text'][key] for key in GROUP_KEYS]
+    sizes = table['text'].groupby(keys, sort=False).size()
+    values = table['values']
+
+    # 只有有限正数参与计算；组内有效值少于 min_group_size 的分组不计算z分数
+    logs = np.log(values.where((values > 0) & (values < np.inf)))
+    grouped = logs.groupby(keys, sort=False)
+    counts = grouped.transform('count')
+    median = grouped.transform('median')
+    deviation = (logs - median).abs()
+    mad = deviation.groupby(keys, sort=False).transform('median')
+
+    checked = logs.notna() & (counts >= min_group_size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = 0.6745 * (logs - median) / mad
+    flagged = checked & (mad > 0) & (z.abs() > z_threshold)
+
+    findings = []
+    for name in values.columns:
+        rows = np.flatnonzero(flagged[name].to_numpy())
+        findings.extend(_findings(table, rows, name, 'z', z[name].to_numpy()[rows].round(2).tolist()))
+    return findings, int(checked.to_numpy().sum()), int((sizes >= min_group_size).sum())
+
+
+def run_quality_gates(csv_file, gate_config=None):
+    """对合并CSV执行全部检查，返回结果字典（``status`` 为 pass/warn/fail）"""
+    settings = dict(DEFAULT_GATE_CONFIG, **(gate_config or {}))
+    start = time.perf_counter()
+
+    table = load_table(csv_file)
+    missing = find_missing_values(table)
+    metric_cells = len(table['text']) * len(table['values'].columns)
+    missing_fraction = len(missing) / metric_cells if metric_cells else 0.0
+    impossible = find_impossible_values(table)
+    outliers, checked_values, checked_groups = find_outliers(
+        table, float(settings['z_threshold']), int(settings['min_group_size']))
+    outlier_fraction = len(outliers) / checked_values if checked_values else 0.0
+
+    violations = []
+    if table['missing_columns']:
+        violations.append(f"missing columns: {', '.join(table['missing_columns'])}")
+    if missing_fraction > float(settings['max_missing_fraction']):
+        violations.append(f"missing value fraction {missing_fraction:.2%} "
+                          f"above {float(settings['max_missing_fraction']):.2%}")
+    if len(impossible) > int(settings['max_impossible_values']):
+        violations.append(f"{len(impossible)} impossible values "
+                          f"(limit {settings['max_impossible_values']})")
+    if outlier_fraction > float(settings['max_outlier_fraction']):
+        violations.append(f"outlier fraction {outlier_fraction:.2%} "
+                          f"above {float(settings['max_outlier_fraction']):.2%}")
+
+    if not violations:
+        status = 'pass'
+    elif settings['action'] == 'fail':
+        status = 'fail'
+    else:
+        status = 'warn'
+
+    return {
+        'status': status,
+        'action': settings['action'],
+        'rows': len(table['text']),
+        'groups': table['text'].groupby(list(GROUP_KEYS)).ngroups,
+        'checked_groups': checked_groups,
+        'checked_values': checked_values,
+        'missing_columns': table['missing_columns'],
+        'missing': missing,
+        'missing_fraction': round(missing_fraction, 6),
+        'impossible': impossible,
+        'outliers': outliers,
+        'outlier_fraction': round(outlier_fraction, 6),
+        'violations': violations,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        'settings': settings
+    }
+
+
+def _finding_line(finding, detail):
+    model, sequence, hwkey, precision = finding['group']
+    # 行号对应CSV文件中的行（第1行为表头）
+    return (f"| {finding['row'] + 2} | {model} | {sequence} | {hwkey} | {precision} | {finding['conc']} | "
+            f"{finding['column']} | {finding['value']} | {detail} |")
+
+
+def generate_quality_report(result, report_file):
+    """生成Markdown格式的质量门禁报告"""
+    status_labels = {'pass': '✅ 通过', 'warn': '⚠️ 警告', 'fail': '❌ 未通过'}
+    settings = result['settings']
+
+    report = f"""# 数据质量门禁报告
+
+## 📊 概要
+- **结果**: {status_labels[result['status']]}（未通过时的处理: {result['action']}）
+- **记录数**: {result['rows']:,}
+- **分组数**: {result['groups']}（计算z分数的分组: {result['checked_groups']}）
+- **检查的指标值**: {result['checked_values']:,}
+- **空的指标值**: {len(result['missing'])}（占比 {result['missing_fraction']:.2%}，上限 {float(settings['max_missing_fraction']):.2%}）
+- **不可能的取值**: {len(result['impossible'])}（上限 {settings['max_impossible_values']}）
+- **离群值**: {len(result['outliers'])}（占比 {result['outlier_fraction']:.2%}，上限 {float(settings['max_outlier_fraction']):.2%}）
+- **缺少的列**: {', '.join(result['missing_columns']) or '无'}
+- **耗时**: {result['elapsed_ms']} ms
+
+## 🔧 检查规则
+- 指标列 {', '.join(METRIC_COLUMNS)} 的非空值必须是有限的正数
+- 空的指标值单独计数（CSV合并时没有对应键的行 inter_*/e2e_* 为空）
+- 按 {' × '.join(GROUP_KEYS)} 分组，在对数尺度上计算稳健z分数，|z| > {settings['z_threshold']} 记为离群值
+- 数据点少于 {settings['min_group_size']} 的分组不计算z分数
+"""
+
+    if result['violations']:
+        report += "\n## ❌ 未通过的门禁\n"
+        report += "".join(f"- {violation}\n" for violation in result['violations'])
+
+    table_header = "| 行 | 模型 | 序列 | hwKey | 精度 | conc | 列 | 值 | {} |\n|---|---|---|---|---|---|---|---|---|\n"
+    if result['missing']:
+        report += f"\n## ⬜ 空的指标值（前 {REPORT_LIMIT} 条）\n\n" + table_header.format('原因')
+        report += "\n".join(_finding_line(f, f['reason']) for f in result['missing'][:REPORT_LIMIT]) + "\n"
+
+    if result['impossible']:
+        report += f"\n## 🚫 不可能的取值（前 {REPORT_LIMIT} 条）\n\n" + table_header.format('原因')
+        report += "\n".join(_finding_line(f, f['reason']) for f in result['impossible'][:REPORT_LIMIT]) + "\n"
+
+    if result['outliers']:
+        outliers = sorted(result['outliers'], key=lambda f: -abs(f['z']))[:REPORT_LIMIT]
+        report += f"\n## 📈 离群值（按 |z| 排序，前 {REPORT_LIMIT} 条）\n\n" + table_header.format('z')
+        report += "\n".join(_finding_line(f, f['z']) for f in outliers) + "\n"
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write(report)
+
+
+def main(gate_config=None):
+    """质量门禁入口，``gate_config`` 为 monitoring.quality_gates 配置，返回检查结果"""
+    csv_file = 'json_data/inference_max_merged.csv'
+    report_file = 'json_data/QUALITY_GATE_REPORT.md'
+
+    if not os.path.exists(csv_file):
+        print(f"❌ Merged CSV not found: {csv_file}")
+        return None
+
+    print(f"🚦 Running quality gates on {csv_file}...")
+    result = run_quality_gates(csv_file, gate_config)
+
+    print(f"   Checked {result['checked_values']:,} values in {result['checked_groups']}/{result['groups']} groups "
+          f"({result['rows']:,} rows) in {result['elapsed_ms']} ms")
+    if result['missing_columns']:
+        print(f"   Missing columns (skipped): {', '.join(result['missing_columns'])}")
+    print(f"   Missing values: {len(result['missing'])} ({result['missing_fraction']:.2%})")
+    print(f"   Impossible values: {len(result['impossible'])}")
+    print(f"   Outliers: {len(result['outliers'])} ({result['outlier_fraction']:.2%})")
+    for violation in result['violations']:
+        print(f"   ⚠️  {violation}")
+
+    generate_quality_report(result, report_file)
+    print(f"📋 Quality gate report: {report_file}")
+
+    status_icons = {'pass': '✅', 'warn': '⚠️ ', 'fail': '❌'}
+    print(f"{status_icons[result['status']]} Quality gates: {result['status']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+原始数据快照包 - 按内容哈希存储每次运行的原始API响应
+
+所有运行共用一个追加写入的包文件（``raw_payloads.pack``），每个数据块是一个
+独立的gzip成员，内容相同的数据只存储一次；``raw_payloads.idx.json`` 记录
+哈希 → (偏移, 长度)。每次运行另外保存一个快照索引，把
+模型|序列|数据类型[|精度] 映射到数据哈希和当次的元数据，读取单个组合时
+只需定位并解压对应的数据块。
+"""
+
+import os
+import gzip
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from raw_store import DEFAULT_RAW_FORMAT, list_raw_files, load_raw_file, raw_file_path, raw_file_stem, write_raw_file
+
+PACK_FILE = 'raw_payloads.pack'
+INDEX_FILE = 'raw_payloads.idx.json'
+SNAPSHOT_FILE = 'raw_snapshot.json'
+
+
+def combination_key(metadata: Dict, stem: str) -> str:
+    """快照索引的键：模型|序列|数据类型，非主精度变体（文件名带精度后缀）再加精度
+
+    与采集结果中 content_hashes 的键一致。
+    """
+    key = f"{metadata.get('model', '')}|{metadata.get('sequence', '')}|{metadata.get('data_type', '')}"
+    precision = metadata.get('precision')
+    if precision and stem.endswith(f"_{precision}"):
+        key = f"{key}|{precision}"
+    return key
+
+
+def _encode_records(records: List) -> bytes:
+    return json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class RawSnapshotBundle:
+    """内容寻址的原始数据包"""
+
+    def __init__(self, bundle_dir: str):
+        self.bundle_dir = bundle_dir
+        self.pack_path = os.path.join(bundle_dir, PACK_FILE)
+        self.index_path = os.path.join(bundle_dir, INDEX_FILE)
+        self.objects: Dict[str, Dict] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.objects = json.load(f).get('objects', {})
+
+    def __contains__(self, payload_hash: str) -> bool:
+        return payload_hash in self.objects
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': datetime.now().isoformat(), 'objects': self.objects}, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def put(self, payload_hash: str, records: List) -> int:
+        """追加一个数据块，已存在时不重复写入；返回新增的字节数
+
+        索引在 ``add_run`` 结束时统一写出；中途失败只会在包文件末尾留下未被
+        索引引用的字节，不影响已有数据。
+        """
+        if payload_hash in self.objects:
+            return 0
+
+        os.makedirs(self.bundle_dir, exist_ok=True)
+        blob = gzip.compress(_encode_records(records), compresslevel=6)
+        with open(self.pack_path, 'ab') as f:
+            offset = f.tell()
+            f.write(blob)
+        self.objects[payload_hash] = {'offset': offset, 'length': len(blob), 'records': len(records)}
+        return len(blob)
+
+    def get(self, payload_hash: str) -> List:
+        """读取单个数据块（只读取并解压该块）"""
+        entry = self.objects.get(payload_hash)
+        if entry is None:
+            raise KeyError(f"Payload {payload_hash} not found in {self.pack_path}")
+        with open(self.pack_path, 'rb') as f:
+            f.seek(entry['offset'])
+            blob = f.read(entry['length'])
+        return json.loads(gzip.decompress(blob))
+
+    def store_payloads(self, raw_dir: str) -> Dict:
+        """把原始数据目录中的所有文件存入包中，返回供 ``write_snapshot`` 使用的采集结果
+
+        应在清理阶段之前调用：清理阶段会把含不合格数据点的文件改写为只剩合格
+        数据点，而包中按上游 ``content_hash`` 存储的必须是上游的完整响应，重建
+        历史版本时才能按当时的结构定义重新校验。已被改写过的文件（元数据中有
+        ``retained_content_hash``，如增量刷新沿用的文件）引用早先存入的上游数据；
+        包中没有时按实际内容的哈希存储，同一个哈希始终对应同一份内容。
+        """
+        payloads = {}
+        stored = 0
+        bytes_added = 0
+
+        for filepath in list_raw_files(raw_dir):
+            file_data = load_raw_file(filepath)
+            metadata = file_data.get('metadata', {})
+            records = file_data.get('data', [])
+
+            # 旧文件没有内容哈希时按数据内容计算
+            payload_hash = metadata.get('content_hash') or hashlib.sha256(_encode_records(records)).hexdigest()
+            if metadata.get('retained_content_hash') and payload_hash not in self.objects:
+                payload_hash = metadata['retained_content_hash']
+            added = self.put(payload_hash, records)
+            if added:
+                stored += 1
+                bytes_added += added
+
+            stem = raw_file_stem(filepath)
+            payloads[combination_key(metadata, stem)] = {
+                'hash': payload_hash,
+                'file': stem,
+                'metadata': metadata
+            }
+
+        # 数据块先写入索引；没有版本引用的数据块在下次清理旧版本时删除
+        self._save_index()
+        return {'payloads': payloads, 'stored': stored, 'bytes_added': bytes_added}
+
+    def write_snapshot(self, capture: Dict, snapshot_path: str, run_id: str) -> Dict:
+        """写出本次运行的快照索引，``capture`` 为 ``store_payloads`` 的返回值"""
+        snapshot = {
+            'run_id': run_id,
+            'created_at': datetime.now().isoformat(),
+            'payloads': capture['payloads']
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+        with open(snapshot_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+
+        return {
+            'payloads': len(capture['payloads']),
+            'stored': capture['stored'],
+            'deduplicated': len(capture['payloads']) - capture['stored'],
+            'bytes_added': capture['bytes_added']
+        }
+
+    def add_run(self, raw_dir: str, snapshot_path: str, run_id: str) -> Dict:
+        """把原始数据目录中的所有文件存入包中，并写出本次运行的快照索引"""
+        return self.write_snapshot(self.store_payloads(raw_dir), snapshot_path, run_id)
+
+    def read_payload(self, snapshot: Dict, key: str) -> Dict:
+        """按 模型|序列|数据类型 读取快照中的一个组合，返回 {'metadata': ..., 'data': [...]}"""
+        entry = snapshot['payloads'][key]
+        return {'metadata': entry['metadata'], 'data': self.get(entry['hash'])}
+
+    def restore(self, snapshot: Dict, target_dir: str, raw_format: Optional[str] = None) -> List[str]:
+        """把快照中的全部组合还原成原始数据文件，返回写出的文件路径"""
+        os.makedirs(target_dir, exist_ok=True)
+        restored = []
+        for entry in snapshot['payloads'].values():
+            filepath = raw_file_path(target_dir, entry['file'], raw_format or DEFAULT_RAW_FORMAT)
+            write_raw_file(filepath, entry['metadata'], self.get(entry['hash']))
+            restored.append(filepath)
+        return restored
+
+    def prune(self, keep_hashes: Iterable[str]) -> Dict:
+        """只保留仍被快照引用的数据块，重写包文件（先写临时文件再原子替换）"""
+        keep = set(keep_hashes)
+        removed = [h for h in self.objects if h not in keep]
+        if not removed:
+            return {'removed': 0, 'bytes_freed': 0}
+
+        old_size = os.path.getsize(self.pack_path)
+        tmp_pack = f"{self.pack_path}.tmp.{os.getpid()}"
+        objects = {}
+        with open(self.pack_path, 'rb') as src, open(tmp_pack, 'wb') as dst:
+            for payload_hash, entry in sorted(self.objects.items(), key=lambda item: item[1]['offset']):
+                if payload_hash not in keep:
+                    continue
+                src.seek(entry['offset'])
+                blob = src.read(entry['length'])
+                objects[payload_hash] = dict(entry, offset=dst.tell())
+                dst.write(blob)
+        os.replace(tmp_pack, self.pack_path)
+        self.objects = objects
+        self._save_index()
+
+        return {'removed': len(removed), 'bytes_freed': old_size - os.path.getsize(self.pack_path)}
+
+
+def load_snapshot(snapshot_path: str) -> Dict:
+    with open(snapshot_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+原始数据文件存储格式 - json_data/raw_json_files 的统一读写入口
+
+支持两种格式：
+- ``json``: 旧格式，带缩进的JSON文本
+- ``json.gz``: gzip压缩的紧凑JSON（默认）
+
+读取时按扩展名自动识别，旧的 ``.json`` 文件可以直接读取。
+"""
+
+import os
+import gzip
+import json
+import glob
+import threading
+from typing import Dict, Iterable, List
+
+RAW_FORMATS = ('json', 'json.gz')
+DEFAULT_RAW_FORMAT = 'json.gz'
+
+# 原始数据目录中的报告/摘要文件，不属于数据文件
+REPORT_FILE_MARKERS = ('readme', 'summary', 'cleanup', 'report')
+
+# 写入中的临时文件后缀（<文件名>.tmp.<pid>.<线程id>），不会被 list_raw_files 匹配
+TEMP_FILE_MARKER = '.tmp.'
+
+
+def raw_file_format(filepath: str) -> str:
+    """根据扩展名判断文件格式"""
+    return 'json.gz' if filepath.endswith('.json.gz') else 'json'
+
+
+def raw_file_stem(filepath: str) -> str:
+    """去掉格式扩展名后的文件名"""
+    filename = os.path.basename(filepath)
+    for suffix in ('.json.gz', '.json'):
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+def raw_file_path(directory: str, stem: str, raw_format: str = DEFAULT_RAW_FORMAT) -> str:
+    """生成指定格式的数据文件路径"""
+    if raw_format not in RAW_FORMATS:
+        raise ValueError(f"Unsupported raw format: {raw_format}")
+    return os.path.join(directory, f"{stem}.{raw_format}")
+
+
+def is_report_file(filepath: str) -> bool:
+    """是否为报告/摘要文件"""
+    filename = os.path.basename(filepath).lower()
+    return any(marker in filename for marker in REPORT_FILE_MARKERS)
+
+
+def list_raw_files(directory: str) -> List[str]:
+    """列出目录下所有数据文件（两种格式），排除报告文件"""
+    files = glob.glob(os.path.join(directory, '*.json')) + glob.glob(os.path.join(directory, '*.json.gz'))
+    return sorted(f for f in files if not is_report_file(f))
+
+
+def remove_temp_files(directory: str) -> int:
+    """删除中断的写入留下的临时文件，返回删除的数量"""
+    removed = 0
+    for path in glob.glob(os.path.join(directory, f"*.json*{TEMP_FILE_MARKER}*")):
+        os.remove(path)
+        removed += 1
+    return removed
+
+
+def load_raw_file(filepath: str) -> Dict:
+    """读取数据文件，返回 {'metadata': ..., 'data': [...]}"""
+    if raw_file_format(filepath) == 'json.gz':
+        with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _indent_json(value, level: int) -> str:
+    """按 indent=2 序列化，并把续行缩进到嵌套层级 level"""
+    return json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n' + ' ' * level)
+
+
+def write_raw_file(filepath: str, metadata: Dict, records: Iterable):
+    """逐条写出数据文件，格式由扩展名决定
+
+    ``.json`` 与 ``json.dump(indent=2)`` 的输出一致；``.json.gz`` 写入不带
+    空白的紧凑JSON。先写入同目录的临时文件再原子替换，中途失败不会留下截断的
+    数据文件。写入后删除同名的另一种格式文件，避免同一组合被重复读取。
+    """
+    compact = raw_file_format(filepath) == 'json.gz'
+    tmp_path = f"{filepath}{TEMP_FILE_MARKER}{os.getpid()}.{threading.get_ident()}"
+
+    try:
+        if compact:
+            f = gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6)
+        else:
+            f = open(tmp_path, 'w', encoding='utf-8')
+        with f:
+            _write_document(f, metadata, records, compact)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    directory = os.path.dirname(filepath)
+    stem = raw_file_stem(filepath)
+    for raw_format in RAW_FORMATS:
+        sibling = raw_file_path(directory, stem, raw_format)
+        if sibling != filepath and os.path.exists(sibling):
+            os.remove(sibling)
+
+
+def _write_document(f, metadata: Dict, records: Iterable, compact: bool):
+    """把 {"metadata": ..., "data": [...]} 逐条写入已打开的文本文件"""
+    if compact:
+        f.write('{"metadata":')
+        f.write(json.dumps(metadata, ensure_ascii=False, separators=(',', ':')))
+        f.write(',"data":[')
+        for row, record in enumerate(records):
+            if row:
+                f.write(',')
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        f.write(']}')
+    else:
+        f.write('{\n  "metadata": ')
+        f.write(_indent_json(metadata, 2))
+        f.write(',\n  "data": [')
+        row = -1
+        for row, record in enumerate(records):
+            f.write(',\n    ' if row else '\n    ')
+            f.write(_indent_json(record, 4))
+        f.write('\n  ]\n}' if row >= 0 else ']\n}')
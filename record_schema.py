@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+InferenceMAX 数据点结构校验 - 由声明式结构定义一次性编译出校验函数
+
+``DATA_POINT_SCHEMA`` 声明每个字段的类型和约束，``compile_validator`` 把它
+生成为一段直线式的Python代码并编译成函数（与 fastjsonschema 的做法相同），
+校验时不再遍历结构定义。校验函数对合格的数据点返回None，否则返回原因。
+"""
+
+import json
+import hashlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 字段类型：number 为 int/float（不含 bool，且必须是有限值）
+DATA_POINT_SCHEMA = {
+    'fields': {
+        'hwKey': {'type': 'string', 'required': True, 'non_empty': True},
+        'conc': {'type': 'integer', 'required': True, 'minimum': 1},
+        'x': {'type': 'number', 'required': True, 'minimum': 0},
+        'y': {'type': 'number', 'required': True, 'minimum': 0},
+        'tp': {'type': 'integer', 'minimum': 1},
+        'precision': {'type': 'string'},
+    },
+    # 嵌套的性能指标对象：{"y": 数值, "roof": 布尔}
+    'metrics': {
+        'fields': ('tpPerGpu', 'tpPerMw', 'costh', 'costn', 'costr'),
+        'value': {'type': 'number', 'required': True},
+        'roof': {'type': 'boolean'}
+    }
+}
+
+_TYPE_CHECKS = {
+    'string': "type({v}) is not str",
+    'integer': "type({v}) is not int",
+    'number': "(type({v}) is not float and type({v}) is not int) or not (-_INF < {v} < _INF)",
+    'boolean': "type({v}) is not bool",
+}
+
+_TYPE_NAMES = {'string': 'string', 'integer': 'integer', 'number': 'finite number', 'boolean': 'boolean'}
+
+
+def _field_lines(source: str, key: str, label: str, spec: Dict, indent: str) -> List[str]:
+    """单个字段的校验代码；``source`` 为字段所在字典的变量名，``label`` 用于错误信息"""
+    lines = [f"{indent}_v = {source}.get({key!r}, _MISSING)"]
+    if spec.get('required'):
+        lines.append(f"{indent}if _v is _MISSING: return 'missing {label}'")
+        check_indent = indent
+    else:
+        lines.append(f"{indent}if _v is not _MISSING:")
+        check_indent = indent + '    '
+
+    lines.append(f"{check_indent}if {_TYPE_CHECKS[spec['type']].format(v='_v')}: "
+                 f"return '{label}: expected {_TYPE_NAMES[spec['type']]}'")
+    if spec.get('non_empty'):
+        lines.append(f"{check_indent}if not _v: return '{label}: empty'")
+    if 'minimum' in spec:
+        lines.append(f"{check_indent}if _v < {spec['minimum']!r}: return '{label}: below {spec['minimum']}'")
+    return lines
+
+
+def compile_validator(schema: Dict = DATA_POINT_SCHEMA) -> Callable[[object], Optional[str]]:
+    """把结构定义编译成校验函数，生成的源码保存在函数的 ``source`` 属性中"""
+    lines = ["def validate(item):",
+             "    if type(item) is not dict: return 'not an object'"]
+    for name, spec in schema.get('fields', {}).items():
+        lines.extend(_field_lines('item', name, name, spec, '    '))
+
+    metrics = schema.get('metrics')
+    if metrics:
+        for name in metrics['fields']:
+            lines.append(f"    _m = item.get({name!r})")
+            lines.append("    if _m is not None:")
+            lines.append(f"        if type(_m) is not dict: return '{name}: expected object'")
+            lines.extend(_field_lines('_m', 'y', f"{name}.y", metrics['value'], '        '))
+            if metrics.get('roof'):
+                lines.extend(_field_lines('_m', 'roof', f"{name}.roof", metrics['roof'], '        '))
+    lines.append("    return None")
+
+    source = '\n'.join(lines)
+    namespace = {'_MISSING': object(), '_INF': float('inf')}
+    exec(compile(source, '<record_schema>', 'exec'), namespace)
+    validate = namespace['validate']
+    validate.source = source
+    return validate
+
+
+# 批量快速路径的检查：只放行最常见的形态，不确定的数据点交给逐条校验
+_BATCH_CHECKS = {
+    'string': "type(_v) is not str",
+    'integer': "type(_v) is not int",
+    'number': "type(_v) is not float and type(_v) is not int",
+    'boolean': "_v is not True and _v is not False",
+}
+
+
+def _batch_condition(spec: Dict) -> str:
+    """字段不满足快速路径时为真的表达式；number 的有限值和下限合并成一次链式比较"""
+    checks = [_BATCH_CHECKS[spec['type']]]
+    if spec['type'] == 'number':
+        # NaN 与任何数比较都为假，链式比较同时排除 NaN、无穷大和低于下限的值
+        lower = f"{spec['minimum']!r} <=" if 'minimum' in spec else "-_INF <"
+        checks.append(f"not ({lower} _v < _INF)")
+    elif 'minimum' in spec:
+        checks.append(f"_v < {spec['minimum']!r}")
+    if spec.get('non_empty'):
+        checks.append("not _v")
+    return ' or '.join(checks)
+
+
+def compile_batch_filter(schema: Dict = DATA_POINT_SCHEMA) -> Callable[[List], List[int]]:
+    """把结构定义编译成整批校验的循环，返回需要逐条校验的数据点下标
+
+    生成的函数在一次调用里遍历整批数据点，每个字段只做一次下标访问和类型判断，
+    没有逐条的函数调用。快速路径要求所有字段（包括可选字段和 ``roof``）都存在，
+    缺字段或类型不符时抛出的 KeyError/TypeError 也只是把该数据点交给逐条校验，
+    因此被放行的数据点一定能通过 ``compile_validator`` 生成的函数。
+    """
+    lines = ["def batch_filter(records):",
+             "    suspects = []",
+             "    for index, item in enumerate(records):",
+             "        try:"]
+    for name, spec in schema.get('fields', {}).items():
+        lines.append(f"            _v = item[{name!r}]")
+        lines.append(f"            if {_batch_condition(spec)}: suspects.append(index); continue")
+
+    metrics = schema.get('metrics')
+    if metrics:
+        for name in metrics['fields']:
+            lines.append(f"            _m = item[{name!r}]")
+            lines.append("            _v = _m['y']")
+            lines.append(f"            if {_batch_condition(metrics['value'])}: suspects.append(index); continue")
+            if metrics.get('roof'):
+                lines.append("            _v = _m['roof']")
+                lines.append(f"            if {_batch_condition(metrics['roof'])}: suspects.append(index); continue")
+    lines.extend(["        except (KeyError, TypeError):",
+                  "            suspects.append(index)",
+                  "    return suspects"])
+
+    source = '\n'.join(lines)
+    namespace = {'_INF': float('inf')}
+    exec(compile(source, '<record_schema batch>', 'exec'), namespace)
+    batch_filter = namespace['batch_filter']
+    batch_filter.source = source
+    return batch_filter
+
+
+validate_data_point = compile_validator()
+batch_filter = compile_batch_filter()
+
+# 结构定义的指纹，元数据中的校验结论和清理阶段的校验缓存只在指纹一致时有效
+SCHEMA_FINGERPRINT = hashlib.sha256(validate_data_point.source.encode('utf-8')).hexdigest()[:16]
+
+
+def split_records(records: List, validate: Callable = validate_data_point,
+                  batch: Callable = batch_filter) -> Tuple[List, List[Dict]]:
+    """按批校验数据点，返回 (合格的数据点, [{'index', 'reason', 'record'}, ...])
+
+    整批先经过 ``batch`` 的快速路径，只有被它挑出来的数据点才逐条校验并给出原因。
+    """
+    suspects = batch(records)
+    if not suspects:
+        return list(records), []
+
+    bad = []
+    for index in suspects:
+        reason = validate(records[index])
+        if reason is not None:
+            bad.append({'index': index, 'reason': reason, 'record': records[index]})
+    if not bad:
+        return list(records), []
+
+    rejected = {entry['index'] for entry in bad}
+    good = [record for index, record in enumerate(records) if index not in rejected]
+    return good, bad
+
+
+def schema_verdict(total_data_points: int, invalid_records: List[Dict]) -> Dict:
+    """写入原始数据元数据的校验结论，``invalid_records`` 只保留下标和原因"""
+    return {
+        'schema': SCHEMA_FINGERPRINT,
+        'validated_at': datetime.now().isoformat(),
+        'total_data_points': total_data_points,
+        'valid_data_points': total_data_points - len(invalid_records),
+        'invalid_records': [{'index': entry['index'], 'reason': entry['reason']} for entry in invalid_records]
+    }
+
+
+# 被隔离的数据点写入原始数据文件旁的 JSON Lines 文件（不会被 list_raw_files 当作数据文件）
+QUARANTINE_SUFFIX = '.quarantine.jsonl'
+
+
+def quarantine_path(filepath: str) -> str:
+    return f"{filepath}{QUARANTINE_SUFFIX}"
+
+
+def append_quarantine(filepath: str, bad_records: List[Dict], reason: Optional[str] = None) -> str:
+    """把不合格的数据点追加到隔离文件，每行一个 {'index', 'reason', 'record', 'quarantined_at'}"""
+    path = quarantine_path(filepath)
+    quarantined_at = datetime.now().isoformat()
+    with open(path, 'a', encoding='utf-8') as f:
+        for entry in bad_records:
+            line = dict(entry, quarantined_at=quarantined_at)
+            if reason:
+                line['reason'] = f"{reason}: {entry['reason']}" if entry.get('reason') else reason
+            f.write(json.dumps(line, ensure_ascii=False) + '\n')
+    return path